@@ -0,0 +1,413 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from math import sqrt
+import numpy as np
+from dsp import pll, low_pass_filter, apply_agc, complex_dtype
+from modulation import qpsk_modulate, qpsk_modulate_baseband
+from demodulation import qpsk_demodulate
+from encoder_decoder import (hamming_encode, hamming_decode, hamming_encode_packed,
+                             hamming_decode_packed, G, H)
+from utils import string_to_binary
+from channel import Channel
+from synchronization import build_frame, preamble_bits, synchronize_frame
+
+# Regression suite: every hot path is run over a range of sizes on synthetic
+# data, up to one second of samples at 6 MS/s. Results can be saved as a JSON
+# baseline and later runs compared against it; a function whose throughput
+# drops, or whose peak memory grows, by more than the threshold fails the run.
+SUITE_FS = 6e6
+SUITE_SIZES = (6000, 60000, 600000, 6000000)
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MEMORY_THRESHOLD = 0.5
+
+
+# Reference copy of the original per-sample pluto.pll, kept for comparison
+def legacy_pll(input_signal, fs, loop_bandwidth=0.01):
+    phase_estimate = 0.0
+    output_signal = np.zeros_like(input_signal, dtype=complex)
+    freq_estimate = 0.0
+    Kp = 2 * np.pi * loop_bandwidth
+    Ki = (Kp ** 2) / 4
+    integrator = 0.0
+
+    for i in range(len(input_signal)):
+        phase_error = np.angle(input_signal[i] * np.exp(-1j * phase_estimate))
+        integrator += Ki * phase_error
+        freq_estimate = integrator + Kp * phase_error
+        phase_estimate += freq_estimate / fs
+        output_signal[i] = input_signal[i] * np.exp(-1j * phase_estimate)
+
+    return output_signal, freq_estimate
+
+# Reference copy of the original per-symbol modulation.qpsk_modulate
+def legacy_qpsk_modulate(encoded_data, tb, fc=500e6, sampling_rate=500):
+    t = np.linspace(0, tb, sampling_rate)
+    c1 = sqrt(2/tb) * np.cos(2 * np.pi * fc * t)
+    c2 = sqrt(2/tb) * np.sin(2 * np.pi * fc * t)
+
+    num_bits = len(encoded_data)
+    qpsk = np.zeros((num_bits // 2, sampling_rate))
+    constellation_points = []
+
+    for i in range(0, num_bits, 2):
+        m_s1 = np.ones(sampling_rate) if encoded_data[i] == 1 else -np.ones(sampling_rate)
+        m_s2 = np.ones(sampling_rate) if encoded_data[i+1] == 1 else -np.ones(sampling_rate)
+
+        qpsk[i // 2] = c1 * m_s1 + c2 * m_s2
+        constellation_points.append([m_s1[0], m_s2[0]])
+
+    return qpsk, t, constellation_points
+
+# Reference copy of the original per-symbol demodulation.qpsk_demodulate
+def legacy_qpsk_demodulate(qpsk_signal, t, c1, c2, num_bits, sampling_rate=500):
+    demod_binary = []
+
+    for i in range(0, num_bits, 2):
+        x1 = np.sum(c1 * qpsk_signal[i // 2])
+        x2 = np.sum(c2 * qpsk_signal[i // 2])
+
+        if x1 > 0 and x2 > 0:
+            demod_binary.extend([1, 1])
+        elif x1 > 0 and x2 < 0:
+            demod_binary.extend([1, 0])
+        elif x1 < 0 and x2 < 0:
+            demod_binary.extend([0, 0])
+        elif x1 < 0 and x2 > 0:
+            demod_binary.extend([0, 1])
+
+    return demod_binary
+
+# Reference copies of the original per-codeword Hamming(7,4) codec
+def legacy_hamming_encode(data):
+    if len(data) % 4 != 0:
+        padding_length = 4 - (len(data) % 4)
+        data = np.concatenate((data, np.zeros(padding_length, dtype=int)))
+    encoded = np.dot(data.reshape(-1, 4), G) % 2
+    return encoded.flatten()
+
+def legacy_hamming_decode(encoded_data):
+    decoded = []
+    for i in range(0, len(encoded_data), 7):
+        syndrome = np.dot(H, encoded_data[i:i+7]) % 2
+        syndrome_decimal = int(''.join(map(str, syndrome)), 2)
+        if syndrome_decimal != 0:
+            encoded_data[i+syndrome_decimal-1] ^= 1
+        decoded.extend([encoded_data[i], encoded_data[i+1], encoded_data[i+2], encoded_data[i+3]])
+    return np.array(decoded)
+
+def time_call(func, *args, repeats=3, **kwargs):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def peak_memory(func, *args, **kwargs):
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def random_bits(num_bits, seed=0):
+    return np.random.default_rng(seed).integers(0, 2, size=num_bits)
+
+def synthetic_iq(num_samples, fs, freq_offset=1e3, snr_db=20, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_samples) / fs
+    iq = 0.1 * np.exp(1j * (2 * np.pi * freq_offset * t + 0.5))
+    noise_std = 0.1 / np.sqrt(2 * 10 ** (snr_db / 10))
+    iq += noise_std * (rng.standard_normal(num_samples) + 1j * rng.standard_normal(num_samples))
+    return iq
+
+def bench_pll(num_samples=6000000, legacy_samples=200000, fs=6e6, repeats=3):
+    iq = synthetic_iq(num_samples, fs)
+    results = {}
+
+    elapsed = time_call(legacy_pll, iq[:legacy_samples], fs, repeats=1)
+    results["legacy"] = legacy_samples / elapsed
+
+    for engine in ("block", "jit"):
+        try:
+            pll(iq[:1024], fs, engine=engine)  # warm-up / compile
+        except ImportError:
+            continue
+        elapsed = time_call(pll, iq, fs, engine=engine, repeats=repeats)
+        results[engine] = num_samples / elapsed
+
+    print(f"PLL throughput ({num_samples} samples, real time = {fs / 1e6:.1f} MS/s)")
+    for name, rate in results.items():
+        print(f"  {name:>8}: {rate / 1e6:8.3f} MS/s  ({rate / fs:7.2f}x real time, "
+              f"{rate / results['legacy']:8.1f}x legacy)")
+    return results
+
+def bench_modulate(num_bits=1000000, legacy_bits=100000, tb=2e-9, repeats=3):
+    bits = random_bits(num_bits)
+    cases = [
+        ("legacy", legacy_bits, lambda b: legacy_qpsk_modulate(b, tb)),
+        ("passband", num_bits, lambda b: qpsk_modulate(b, tb)),
+        ("baseband", num_bits, lambda b: qpsk_modulate_baseband(b)),
+        ("rrc x8", num_bits, lambda b: qpsk_modulate_baseband(b, 8, pulse='rrc')),
+    ]
+    results = {}
+
+    print(f"QPSK modulation ({num_bits} bits, legacy on {legacy_bits} bits)")
+    for name, n, func in cases:
+        elapsed = time_call(func, bits[:n], repeats=1 if name == "legacy" else repeats)
+        peak = peak_memory(func, bits[:n])
+        rate = (n // 2) / elapsed
+        results[name] = {"symbols_per_s": rate, "peak_bytes_per_symbol": peak / (n // 2)}
+        print(f"  {name:>8}: {rate / 1e6:8.3f} Msym/s  peak {peak / 2**20:8.1f} MiB "
+              f"({peak / (n // 2):7.1f} B/symbol)")
+    return results
+
+def bench_demodulate(num_bits=200000, legacy_bits=20000, tb=2e-9, fc=500e6, repeats=3):
+    bits = random_bits(num_bits)
+    qpsk_signal, t, _ = qpsk_modulate(bits, tb, fc)
+    c1 = sqrt(2/tb) * np.cos(2 * np.pi * fc * t)
+    c2 = sqrt(2/tb) * np.sin(2 * np.pi * fc * t)
+    cases = [
+        ("legacy", legacy_bits, lambda n: legacy_qpsk_demodulate(qpsk_signal, t, c1, c2, n)),
+        ("hard", num_bits, lambda n: qpsk_demodulate(qpsk_signal, t, c1, c2, n)),
+        ("soft", num_bits, lambda n: qpsk_demodulate(qpsk_signal, t, c1, c2, n, soft=True)),
+    ]
+    results = {}
+
+    print(f"QPSK demodulation ({num_bits} bits, legacy on {legacy_bits} bits)")
+    for name, n, func in cases:
+        elapsed = time_call(func, n, repeats=1 if name == "legacy" else repeats)
+        rate = (n // 2) / elapsed
+        results[name] = rate
+        print(f"  {name:>8}: {rate / 1e6:8.3f} Msym/s")
+    return results
+
+def bench_hamming(num_bits=8000000, legacy_bits=280000, repeats=3):
+    bits = random_bits(num_bits)
+    encoded = hamming_encode(bits)
+    packed_bits = np.packbits(bits)
+    packed_encoded, num_encoded = hamming_encode_packed(packed_bits, num_bits)
+    legacy_encoded = encoded[:legacy_bits // 4 * 7]
+    cases = [
+        ("legacy encode", legacy_bits, lambda: legacy_hamming_encode(bits[:legacy_bits])),
+        ("legacy decode", legacy_bits, lambda: legacy_hamming_decode(legacy_encoded.copy())),
+        ("encode", num_bits, lambda: hamming_encode(bits)),
+        ("decode", num_bits, lambda: hamming_decode(encoded)),
+        ("packed encode", num_bits, lambda: hamming_encode_packed(packed_bits, num_bits)),
+        ("packed decode", num_bits, lambda: hamming_decode_packed(packed_encoded, num_encoded)),
+    ]
+    results = {}
+
+    print(f"Hamming(7,4) throughput in data Mbit/s ({num_bits} bits, legacy on {legacy_bits} bits)")
+    for name, n, func in cases:
+        elapsed = time_call(func, repeats=1 if name.startswith("legacy") else repeats)
+        rate = n / elapsed
+        results[name] = rate
+        print(f"  {name:>14}: {rate / 1e6:9.2f} Mbit/s")
+    return results
+
+def random_text(num_chars, seed=0):
+    return np.random.default_rng(seed).integers(32, 127, size=num_chars, dtype=np.uint8).tobytes().decode('ascii')
+
+def suite_cases(fs=SUITE_FS, tb=2e-9, fc=500e6, sampling_rate=500):
+    # name -> (unit, prepare); prepare(size) builds the synthetic input and
+    # returns (call, items), with items the samples or bits processed per call.
+    # Waveform functions are sized in output samples, the passband QPSK paths
+    # at sampling_rate samples per symbol; the coding paths in payload bits.
+    def modulate(size):
+        bits = random_bits(max(2 * (size // sampling_rate), 2))
+        return (lambda: qpsk_modulate(bits, tb, fc, sampling_rate)), len(bits) // 2 * sampling_rate
+
+    def demodulate(size):
+        bits = random_bits(max(2 * (size // sampling_rate), 2))
+        qpsk_signal, t, _ = qpsk_modulate(bits, tb, fc, sampling_rate)
+        return (lambda: qpsk_demodulate(qpsk_signal, t, None, None, len(bits), sampling_rate, tb=tb, fc=fc)), qpsk_signal.size
+
+    def encode(size):
+        bits = random_bits(size // 4 * 4)
+        return (lambda: hamming_encode(bits)), len(bits)
+
+    def decode(size):
+        encoded = hamming_encode(random_bits(size // 4 * 4))
+        encoded[::97] ^= 1  # a sprinkling of correctable errors
+        return (lambda: hamming_decode(encoded)), len(encoded) // 7 * 4
+
+    def carrier_recovery(size):
+        iq = synthetic_iq(size, fs)
+        return (lambda: pll(iq, fs)), size
+
+    def lowpass(size):
+        iq = synthetic_iq(size, fs)
+        return (lambda: low_pass_filter(iq, 0.1 * fs, fs)), size
+
+    def agc(size):
+        iq = synthetic_iq(size, fs)
+        return (lambda: apply_agc(iq)), size
+
+    def text_to_bits(size):
+        text = random_text(size // 8)
+        return (lambda: string_to_binary(text)), len(text) * 8
+
+    # Frame search, timing and carrier recovery on a capture holding one
+    # frame about half its length, at 8 samples per symbol and 10 dB Es/N0
+    def synchronize(size, samples_per_symbol=8):
+        num_symbols = max(size // (2 * samples_per_symbol) - len(preamble_bits()) // 2, 1)
+        bits = random_bits(2 * num_symbols)
+        frame = build_frame(bits, samples_per_symbol)
+        iq = np.zeros(max(size, 2 * len(frame)), dtype=np.complex64)
+        iq[len(iq) // 4:len(iq) // 4 + len(frame)] = frame
+        Channel(snr_db=10, freq_offset=1e-4, phase=1.0, seed=0).process(iq, out=iq)
+        return (lambda: synchronize_frame(iq, len(bits), samples_per_symbol)), len(iq)
+
+    # AGC -> PLL -> LPF on one buffer per precision mode, allocating a new
+    # array per stage or reusing one working buffer
+    def rx_chain(precision, in_place):
+        def prepare(size):
+            iq = synthetic_iq(size, fs).astype(complex_dtype(precision))
+            cutoff = 0.1 * (fs / 2)
+            if in_place:
+                work = np.empty_like(iq)
+
+                def call():
+                    apply_agc(iq, out=work)
+                    pll(work, fs, out=work)
+                    return low_pass_filter(work, cutoff, fs, out=work)
+            else:
+                def call():
+                    return low_pass_filter(pll(apply_agc(iq), fs)[0], cutoff, fs)
+            return call, size
+        return prepare
+
+    return {
+        "qpsk_modulate": ("samples", modulate),
+        "qpsk_demodulate": ("samples", demodulate),
+        "hamming_encode": ("bits", encode),
+        "hamming_decode": ("bits", decode),
+        "pll": ("samples", carrier_recovery),
+        "low_pass_filter": ("samples", lowpass),
+        "apply_agc": ("samples", agc),
+        "string_to_binary": ("bits", text_to_bits),
+        "synchronize_frame": ("samples", synchronize),
+        "rx_chain_double": ("samples", rx_chain("double", False)),
+        "rx_chain_single": ("samples", rx_chain("single", False)),
+        "rx_chain_single_inplace": ("samples", rx_chain("single", True)),
+    }
+
+def run_suite(sizes=SUITE_SIZES, names=None, repeats=3, cases=None):
+    cases = suite_cases() if cases is None else cases
+    results = {}
+    for name, (unit, prepare) in cases.items():
+        if names and name not in names:
+            continue
+        for size in sizes:
+            call, items = prepare(size)
+            call()  # warm-up: caches, numba compilation
+            elapsed = time_call(call, repeats=repeats)
+            peak = peak_memory(call)
+            results[f"{name}/{size}"] = {
+                "function": name, "size": size, "unit": unit, "items": items,
+                "seconds": elapsed, "throughput": items / elapsed, "peak_bytes": peak,
+            }
+            print(f"  {name:>24} {size:>9}: {items / elapsed / 1e6:10.3f} M{unit}/s  "
+                  f"peak {peak / 2**20:8.1f} MiB")
+    return results
+
+def environment():
+    try:
+        import numba
+        numba_version = numba.__version__
+    except ImportError:
+        numba_version = None
+    return {"python": platform.python_version(), "numpy": np.__version__, "numba": numba_version,
+            "machine": platform.machine(), "processor": platform.processor()}
+
+def save_baseline(results, path):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+def load_baseline(path):
+    # (results, environment); baselines saved before the environment was
+    # recorded give None
+    with open(path) as f:
+        baseline = json.load(f)
+    return baseline["results"], baseline.get("environment")
+
+def environment_changes(saved):
+    # {field: (saved, current)} for every environment field that differs
+    current = environment()
+    saved = saved or {}
+    return {name: (saved.get(name), value) for name, value in current.items() if saved.get(name) != value}
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD, memory_threshold=DEFAULT_MEMORY_THRESHOLD):
+    # Relative change per case. A case missing from either side is reported
+    # too, as (key, "missing from baseline" / "missing from results", None, None, None),
+    # so pass only the baseline entries the run was meant to cover.
+    regressions = []
+    for key in sorted(baseline.keys() - results.keys()):
+        regressions.append((key, "missing from results", None, None, None))
+    for key, current in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            regressions.append((key, "missing from baseline", None, None, None))
+            continue
+        speed = current["throughput"] / reference["throughput"] - 1
+        if speed < -threshold:
+            regressions.append((key, "throughput", reference["throughput"], current["throughput"], speed))
+        if reference["peak_bytes"]:
+            memory = current["peak_bytes"] / reference["peak_bytes"] - 1
+            if memory > memory_threshold:
+                regressions.append((key, "peak_bytes", reference["peak_bytes"], current["peak_bytes"], memory))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DSP hot paths")
+    parser.add_argument("--legacy", action="store_true",
+                        help="compare against the original implementations instead of running the suite")
+    parser.add_argument("--samples", type=int, default=6000000, help="PLL samples for --legacy")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SUITE_SIZES))
+    parser.add_argument("--only", nargs="+", help="run only these functions")
+    parser.add_argument("--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--save-baseline", help="write the results as a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative throughput drop")
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_MEMORY_THRESHOLD,
+                        help="allowed relative peak memory growth")
+    args = parser.parse_args()
+
+    if args.legacy:
+        bench_pll(num_samples=args.samples, repeats=args.repeats)
+        bench_modulate(repeats=args.repeats)
+        bench_demodulate(repeats=args.repeats)
+        bench_hamming(repeats=args.repeats)
+        return
+
+    print(f"Benchmark suite (sizes {args.sizes}, best of {args.repeats})")
+    results = run_suite(args.sizes, args.only, args.repeats)
+    if args.save_baseline:
+        save_baseline(results, args.save_baseline)
+    if args.baseline:
+        baseline, saved_environment = load_baseline(args.baseline)
+        # Throughput only compares like with like
+        for name, (saved, current) in environment_changes(saved_environment).items():
+            print(f"WARNING environment differs from the baseline: {name} {saved} -> {current}")
+        # Only the cases and sizes selected for this run are expected
+        baseline = {key: entry for key, entry in baseline.items()
+                    if entry["size"] in args.sizes and (not args.only or entry["function"] in args.only)}
+        regressions = compare_to_baseline(results, baseline, args.threshold, args.memory_threshold)
+        for key, metric, reference, current, change in regressions:
+            if change is None:
+                print(f"MISSING {key}: {metric}")
+            else:
+                print(f"REGRESSION {key} {metric}: {reference:.4g} -> {current:.4g} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import argparse
+import json
+import multiprocessing
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.stats import beta
+from modulation import qpsk_modulate
+from demodulation import qpsk_demodulate
+from channel import Channel, noise_std
+from fec import make_codec
+from waveforms import carriers
+
+# Monte Carlo BER vs. SNR for the Hamming + QPSK chain. Every (SNR point,
+# batch) work unit draws from its own SeedSequence([seed, snr_index,
+# batch_index]), and stopping is decided after whole waves of batches, so the
+# results only depend on the seed, never on the number of workers.
+#
+# SNR is Eb/N0 per transmitted (coded) bit: with carrier energy E = sum(c1**2)
+# each correlator output is +/-E plus noise of variance sigma**2 * E, so
+# sigma**2 = E / (2 * Eb/N0) gives an uncoded BER of Q(sqrt(2 * Eb/N0)). The
+# noise comes from channel.Channel with symbol energy 2E (two bits per symbol).
+# With snr_per_info_bit the energy is counted per information bit instead
+# (Eb/N0 of the coded bits lowered by the code rate), which is the fair axis
+# for comparing codes of different rates. fec is a fec.make_codec spec; with
+# soft=True the decoder gets LLRs instead of hard decisions.
+#
+# After every wave, progress(points_done, num_points) is called and
+# should_stop() is polled; when it returns True the sweep ends early and
+# returns what was counted so far.
+
+def run_batch(snr_db, batch_bits, seed, snr_index, batch_index, tb, fc, sampling_rate,
+              fec="hamming", soft=False, snr_per_info_bit=False):
+    rng = np.random.default_rng(np.random.SeedSequence([seed, snr_index, batch_index]))
+    bits = rng.integers(0, 2, size=batch_bits)
+
+    codec = make_codec(fec)
+    encoded_data = codec.encode(bits)
+    qpsk_signal, t, _ = qpsk_modulate(encoded_data, tb, fc, sampling_rate)
+    _, c1, c2 = carriers(tb, fc, sampling_rate)
+
+    code_rate = batch_bits / len(encoded_data) if snr_per_info_bit else 1.0
+    samples = qpsk_signal.reshape(-1)
+    symbol_energy = 2 * np.sum(c1 ** 2)
+    Channel(snr_db, "ebn0", symbol_energy=symbol_energy, code_rate=code_rate, seed=rng).process(samples, out=samples)
+
+    noise_var = noise_std(snr_db, symbol_energy, "ebn0", code_rate=code_rate) ** 2
+    demod_binary = qpsk_demodulate(qpsk_signal, t, c1, c2, len(encoded_data), sampling_rate,
+                                   soft=soft, noise_var=noise_var, tb=tb, fc=fc)
+    decoded_data = codec.decode(demod_binary, batch_bits, soft=soft)
+    return int(np.sum(bits != decoded_data[:batch_bits]))
+
+def _run_batch(args):
+    return run_batch(*args)
+
+def confidence_interval(errors, bits, confidence=0.95):
+    # Clopper-Pearson (exact binomial) interval for the bit error rate
+    alpha = 1 - confidence
+    lower = beta.ppf(alpha / 2, errors, bits - errors + 1) if errors > 0 else 0.0
+    upper = beta.ppf(1 - alpha / 2, errors + 1, bits - errors) if errors < bits else 1.0
+    return float(lower), float(upper)
+
+def simulate_ber(snr_values, batch_bits=4096, target_errors=100, max_bits=10**6,
+                 confidence=0.95, rel_precision=None, batches_per_wave=4,
+                 max_workers=None, seed=0, tb=1/500e6, fc=500e6, sampling_rate=500,
+                 fec="hamming", soft=False, snr_per_info_bit=False, coded=None,
+                 should_stop=None, progress=None):
+    if coded is not None:
+        # Deprecated: coded=True/False from before fec specs, i.e. "hamming"/"none"
+        warnings.warn("simulate_ber(coded=...) is deprecated, use fec='hamming' or fec='none'",
+                      DeprecationWarning, stacklevel=2)
+        fec = "hamming" if coded else "none"
+    snr_values = np.asarray(snr_values, dtype=float)
+    errors = np.zeros(len(snr_values), dtype=np.int64)
+    bits = np.zeros(len(snr_values), dtype=np.int64)
+    batches = np.zeros(len(snr_values), dtype=np.int64)
+    active = list(range(len(snr_values)))
+
+    # Spawned workers: the sweep may be started from a thread (the Streamlit
+    # app's job executor), and forking a multi-threaded process is unsafe
+    executor = (ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+                if max_workers != 1 else None)
+    try:
+        while active:
+            jobs = [(snr_values[i], batch_bits, seed, i, batches[i] + k, tb, fc, sampling_rate,
+                     fec, soft, snr_per_info_bit)
+                    for i in active for k in range(batches_per_wave)]
+            counts = executor.map(_run_batch, jobs) if executor is not None else map(_run_batch, jobs)
+            for job, count in zip(jobs, counts):
+                i = job[3]
+                errors[i] += count
+                bits[i] += batch_bits
+                batches[i] += 1
+
+            still_active = []
+            for i in active:
+                if errors[i] >= target_errors or bits[i] >= max_bits:
+                    continue
+                if rel_precision is not None and errors[i] > 0:
+                    lower, upper = confidence_interval(errors[i], bits[i], confidence)
+                    if (upper - lower) / 2 <= rel_precision * errors[i] / bits[i]:
+                        continue
+                still_active.append(i)
+            active = still_active
+            if progress is not None:
+                progress(len(snr_values) - len(active), len(snr_values))
+            if should_stop is not None and should_stop():
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    bounds = [confidence_interval(e, b, confidence) for e, b in zip(errors, bits)]
+    return {
+        "snr_db": snr_values,
+        "ber": errors / bits,
+        "ber_lower": np.array([lower for lower, _ in bounds]),
+        "ber_upper": np.array([upper for _, upper in bounds]),
+        "errors": errors,
+        "bits": bits,
+        "confidence": confidence,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo BER vs. SNR simulation")
+    parser.add_argument("--snr", type=float, nargs=3, default=[0, 10, 1], metavar=("START", "STOP", "STEP"),
+                        help="SNR (Eb/N0) range in dB, stop inclusive")
+    parser.add_argument("--batch-bits", type=int, default=4096)
+    parser.add_argument("--target-errors", type=int, default=100)
+    parser.add_argument("--max-bits", type=int, default=10**6)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--rel-precision", type=float, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fec", default="hamming", help="FEC spec, e.g. hamming, conv:3/4, crc32+conv:1/2")
+    parser.add_argument("--uncoded", action="store_true", help="Skip FEC (same as --fec none)")
+    parser.add_argument("--soft", action="store_true", help="Soft-decision decoding")
+    parser.add_argument("--per-info-bit", action="store_true", help="SNR is Eb/N0 per information bit")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    start, stop, step = args.snr
+    results = simulate_ber(np.arange(start, stop + step / 2, step), batch_bits=args.batch_bits,
+                           target_errors=args.target_errors, max_bits=args.max_bits,
+                           confidence=args.confidence, rel_precision=args.rel_precision,
+                           max_workers=args.workers, seed=args.seed,
+                           fec="none" if args.uncoded else args.fec, soft=args.soft,
+                           snr_per_info_bit=args.per_info_bit)
+
+    for i, snr_db in enumerate(results["snr_db"]):
+        print(f"SNR {snr_db:5.1f} dB: BER {results['ber'][i]:.3e} "
+              f"[{results['ber_lower'][i]:.3e}, {results['ber_upper'][i]:.3e}] "
+              f"({results['errors'][i]} errors / {results['bits'][i]} bits)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({key: value.tolist() if isinstance(value, np.ndarray) else value
+                       for key, value in results.items()}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import numpy as np
+from scipy import signal
+from scipy.special import j0
+
+# Channel models for simulation: calibrated AWGN plus, for complex baseband,
+# carrier frequency offset, Wiener phase noise and Rayleigh/Rician flat fading.
+#
+# SNR is Es/N0 (or Eb/N0 with Es = Eb * bits_per_symbol * code_rate), where
+# Es is the energy of one symbol in sample units, sum(|s[n]|**2) over a symbol.
+# Complex noise has variance N0 per sample (N0 / 2 per component); real
+# (passband) noise has variance N0 / 2 per sample, which is what a correlator
+# receiver sees. With unit-energy pulses (modulation.rrc_taps) Es is the symbol
+# energy; for qpsk_modulate it is sum(c1**2) + sum(c2**2).
+
+def esn0_db(snr_db, snr_type="esn0", bits_per_symbol=2, code_rate=1.0):
+    if snr_type == "esn0":
+        return snr_db
+    if snr_type == "ebn0":
+        return snr_db + 10 * np.log10(bits_per_symbol * code_rate)
+    raise ValueError(f"Unknown SNR type: {snr_type}")
+
+def noise_std(snr_db, symbol_energy=1.0, snr_type="esn0", bits_per_symbol=2, code_rate=1.0):
+    # Standard deviation of each real noise component
+    n0 = symbol_energy / 10 ** (esn0_db(snr_db, snr_type, bits_per_symbol, code_rate) / 10)
+    return np.sqrt(n0 / 2)
+
+
+class Channel:
+    # Streaming channel: process() takes consecutive chunks of one signal and
+    # carries the carrier phase, the fading process and the random stream
+    # between calls, so long simulations run chunk by chunk in bounded memory.
+    # Noise, phase and gain are generated into scratch buffers that are reused
+    # across calls, and process(x, out=x) works in place.
+    #
+    # fading="rayleigh" or "rician" multiplies by a unit-power complex gain h;
+    # for Rician, h = sqrt(K / (K + 1)) + sqrt(1 / (K + 1)) * diffuse. The
+    # diffuse part is a first-order Gauss-Markov process with correlation
+    # J0(2 pi doppler / fs) between samples, or one constant draw per reset()
+    # (block fading) when doppler is 0.
+    def __init__(self, snr_db=None, snr_type="esn0", symbol_energy=1.0, samples_per_symbol=1,
+                 bits_per_symbol=2, code_rate=1.0, fs=1.0, freq_offset=0.0, phase=0.0,
+                 phase_noise=0.0, fading=None, k_factor=0.0, doppler=0.0, seed=None):
+        if fading not in (None, "rayleigh", "rician"):
+            raise ValueError(f"Unknown fading model: {fading}")
+        self.snr_db = snr_db
+        self.snr_type = snr_type
+        self.symbol_energy = symbol_energy  # None: measure from each chunk
+        self.samples_per_symbol = samples_per_symbol
+        self.bits_per_symbol = bits_per_symbol
+        self.code_rate = code_rate
+        self.fs = float(fs)
+        self.freq_offset = freq_offset
+        self.initial_phase = phase
+        self.phase_noise = phase_noise  # Wiener phase increment std, rad per sample
+        self.fading = fading
+        self.k_factor = k_factor if fading == "rician" else 0.0
+        self.correlation = j0(2 * np.pi * doppler / self.fs)
+        self.rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+        self._buffers = {}
+        self.reset()
+
+    def reset(self):
+        self.phase = float(self.initial_phase)
+        self._fading_state = None
+
+    @property
+    def rotates(self):
+        return self.freq_offset != 0 or self.initial_phase != 0 or self.phase_noise > 0
+
+    def _buffer(self, name, n, dtype):
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.dtype != dtype or len(buffer) < n:
+            buffer = self._buffers[name] = np.empty(n, dtype=dtype)
+        return buffer[:n]
+
+    def _fill_normal(self, buffer):
+        # Standard normal draws straight into buffer (both components if complex)
+        real = buffer.view(buffer.real.dtype) if np.iscomplexobj(buffer) else buffer
+        self.rng.standard_normal(out=real, dtype=real.dtype)
+
+    def _phase(self, n):
+        phase = self._buffer("phase", n, np.float64)
+        if self.phase_noise > 0:
+            self._fill_normal(phase)
+            phase *= self.phase_noise
+        else:
+            phase.fill(0.0)
+        phase += 2 * np.pi * self.freq_offset / self.fs
+        np.cumsum(phase, out=phase)
+        phase += self.phase
+        self.phase = float(np.mod(phase[-1], 2 * np.pi))
+        # The phase ramp starts one increment after the previous chunk's last sample
+        return phase
+
+    def _fading_gain(self, n, dtype):
+        diffuse = self._buffer("fading", n, dtype)
+        self._fill_normal(diffuse)
+        diffuse *= np.sqrt(0.5)
+        if self._fading_state is None:
+            self._fading_state = complex(self.rng.standard_normal(), self.rng.standard_normal()) * np.sqrt(0.5)
+        a = self.correlation
+        diffuse[:], _ = signal.lfilter([np.sqrt(max(1 - a * a, 0.0))], [1, -a], diffuse,
+                                        zi=[a * self._fading_state])
+        self._fading_state = diffuse[-1]
+        los = np.sqrt(self.k_factor / (self.k_factor + 1))
+        diffuse *= np.sqrt(1 / (self.k_factor + 1))
+        diffuse += los
+        return diffuse
+
+    def process(self, input_signal, out=None):
+        x = np.asarray(input_signal)
+        if not np.iscomplexobj(x) and (self.rotates or self.fading is not None):
+            raise ValueError("Carrier offset, phase noise and fading need a complex baseband signal")
+        dtype = x.dtype if x.dtype in (np.float32, np.float64, np.complex64, np.complex128) else np.float64
+        symbol_energy = self.symbol_energy
+        if symbol_energy is None and len(x):
+            symbol_energy = np.mean(np.abs(x) ** 2) * self.samples_per_symbol
+        if out is None:
+            out = np.empty(x.shape, dtype=dtype)
+        if out is not x:
+            np.copyto(out, x)
+        if len(out) == 0:
+            return out
+
+        if self.fading is not None:
+            out *= self._fading_gain(len(out), out.dtype)
+        if self.rotates:
+            phase = self._phase(len(out))
+            rotor = self._buffer("rotor", len(out), out.dtype)
+            np.cos(phase, out=rotor.real)
+            np.sin(phase, out=rotor.imag)
+            out *= rotor
+
+        if self.snr_db is not None:
+            std = noise_std(self.snr_db, symbol_energy, self.snr_type, self.bits_per_symbol, self.code_rate)
+            noise = self._buffer("noise", len(out), out.dtype)
+            self._fill_normal(noise)
+            noise *= std
+            out += noise
+        return out
+
+    def stream(self, chunks):
+        for chunk in chunks:
+            yield self.process(chunk)
+
+
+def awgn(input_signal, snr_db, symbol_energy=1.0, snr_type="esn0", seed=None, out=None, **kwargs):
+    return Channel(snr_db, snr_type, symbol_energy, seed=seed, **kwargs).process(input_signal, out=out)
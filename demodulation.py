@@ -1,19 +1,62 @@
 import numpy as np
+from waveforms import carrier_matrix
 
-def qpsk_demodulate(qpsk_signal, t, c1, c2, num_bits, sampling_rate=500):
-    demod_binary = []
+# Soft outputs: a blind noise-variance estimate is floored at NOISE_FLOOR times
+# the signal power, since a clean signal would estimate zero noise and give
+# infinite LLRs, and LLRs are clipped to +/-LLR_LIMIT
+NOISE_FLOOR = 1e-6
+LLR_LIMIT = 100.0
 
-    for i in range(0, num_bits, 2):
-        x1 = np.sum(c1 * qpsk_signal[i // 2])
-        x2 = np.sum(c2 * qpsk_signal[i // 2])
+def qpsk_demodulate(qpsk_signal, t, c1, c2, num_bits, sampling_rate=500, soft=False, noise_var=None,
+                    tb=None, fc=None):
+    qpsk_signal = np.asarray(qpsk_signal)
+    num_symbols = num_bits // 2
 
-        if x1 > 0 and x2 > 0:
-            demod_binary.extend([1, 1])
-        elif x1 > 0 and x2 < 0:
-            demod_binary.extend([1, 0])
-        elif x1 < 0 and x2 < 0:
-            demod_binary.extend([0, 0])
-        elif x1 < 0 and x2 > 0:
-            demod_binary.extend([0, 1])
+    # With tb and fc the carriers come from the shared waveform cache, and c1/c2 may be None
+    if tb is not None and fc is not None:
+        carriers = carrier_matrix(tb, fc, sampling_rate, np.float32 if qpsk_signal.dtype == np.float32 else np.float64)[1]
+        c1 = carriers[0]
+    else:
+        carriers = np.vstack((c1, c2))
 
-    return demod_binary
+    # Correlate every symbol with both carriers in a single matrix product
+    correlations = qpsk_signal[:num_symbols] @ carriers.T
+
+    if soft:
+        # Each correlation is +/-E plus Gaussian noise of variance noise_var * E,
+        # with E the carrier energy, so the LLR reduces to 2 * x / noise_var
+        if noise_var is None:
+            energy = np.sum(np.asarray(c1) ** 2)
+            signal_power = np.mean(np.abs(correlations)) ** 2 / energy
+            noise_var = _floor_noise_var(np.var(np.abs(correlations)) / energy, signal_power)
+        return _llrs(correlations, 1, noise_var)
+
+    return _hard_decisions(correlations)
+
+def qpsk_demodulate_baseband(symbols, soft=False, noise_var=None):
+    # Inverse of modulation.qpsk_modulate_baseband at one sample per symbol
+    symbols = np.asarray(symbols)
+    components = np.stack((symbols.real, symbols.imag), axis=1)
+
+    if soft:
+        # Per-axis amplitude A = 1/sqrt(2): LLR = 2 * A * y / sigma^2, where
+        # noise_var is the per-axis noise variance
+        amplitude = 1 / np.sqrt(2)
+        if noise_var is None:
+            signal_power = np.mean(np.abs(components)) ** 2
+            noise_var = _floor_noise_var(np.var(np.abs(components)), signal_power)
+        return _llrs(components, amplitude, noise_var)
+
+    return _hard_decisions(components)
+
+def _floor_noise_var(noise_var, signal_power):
+    return max(noise_var, NOISE_FLOOR * signal_power, np.finfo(float).tiny)
+
+def _llrs(components, amplitude, noise_var):
+    llrs = (2 * amplitude / noise_var) * components
+    return np.clip(llrs, -LLR_LIMIT, LLR_LIMIT).reshape(-1)
+
+def _hard_decisions(components):
+    # Positive in-phase / quadrature component -> bit 1, as in qpsk_modulate.
+    # Soft outputs use the same order, with a positive LLR favouring bit 1.
+    return (components > 0).astype(int).reshape(-1)
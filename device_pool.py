@@ -0,0 +1,139 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# RF settings applied by create_pluto_instance, in the order they are set
+PLUTO_CONFIG = {
+    "rx_rf_bandwidth": 4000000,
+    "sample_rate": 6000000,
+    "rx_lo": 500000000,  # 500 MHz Local Oscillator
+    "tx_lo": 500000000,  # 500 MHz Local Oscillator
+    "tx_cyclic_buffer": True,
+    "tx_hardwaregain_chan0": -10,
+    "gain_control_mode_chan0": "manual",
+    "rx_hardwaregain_chan0": 50,
+    "rx_enabled_channels": [0],
+    "tx_enabled_channels": [0],
+}
+
+def _scan_contexts():
+    import iio
+    return iio.scan_contexts()
+
+def open_pluto(uri):
+    # "replay:<path>" serves a recording made with iq_recording.record instead of a radio
+    if uri.startswith("replay:"):
+        from iq_recording import ReplayPluto
+        return ReplayPluto(uri[len("replay:"):], loop=True)
+    import adi
+    return adi.Pluto(uri=uri)
+
+def close_pluto(sdr):
+    # Tear down the RX/TX buffers libiio holds for the device
+    for name in ("rx_destroy_buffer", "tx_destroy_buffer"):
+        destroy = getattr(sdr, name, None)
+        if destroy is not None:
+            destroy()
+
+def discover_devices(scan=None):
+    # {uri: description} for every PlutoSDR libiio can see
+    contexts = (scan or _scan_contexts)()
+    return {uri: description for uri, description in contexts.items()
+            if "pluto" in description.lower() or "adalm" in description.lower()}
+
+
+class DeviceSession:
+    def __init__(self, uri, sdr):
+        self.uri = uri
+        self.sdr = sdr
+        self.config = {}
+        self.lock = threading.Lock()
+
+    def configure(self, config):
+        # Only push the properties whose value differs from what was last applied
+        changed = {name: value for name, value in config.items() if self.config.get(name) != value}
+        for name, value in changed.items():
+            setattr(self.sdr, name, value)
+            self.config[name] = value
+        return changed
+
+
+class DevicePool:
+    # Keeps one configured session per device URI for the life of the process,
+    # so repeated runs skip reopening the USB context and re-pushing settings.
+    # open_device and scan default to adi.Pluto and iio.scan_contexts and can be
+    # replaced, e.g. by mocks or FakePluto. The default device (uri=None) is
+    # resolved by one scan and remembered; it is scanned for again only by an
+    # explicit discover() or when opening the remembered URI fails.
+    def __init__(self, open_device=None, scan=None):
+        self.open_device = open_device or open_pluto
+        self.scan = scan or _scan_contexts
+        self.default_uri = None
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def discover(self):
+        devices = discover_devices(self.scan)
+        self.default_uri = min(devices) if devices else None
+        return devices
+
+    def _resolve_default(self):
+        if self.default_uri is None and not self.discover():
+            raise RuntimeError("No PlutoSDR devices found")
+        return self.default_uri
+
+    def session(self, uri=None, config=None):
+        if uri is not None:
+            return self._open(uri, config)
+        uri = self._resolve_default()
+        try:
+            return self._open(uri, config)
+        except Exception:
+            # The remembered device may be gone (unplugged, re-enumerated)
+            self.default_uri = None
+            if self._resolve_default() == uri:
+                raise
+            return self._open(self.default_uri, config)
+
+    def _open(self, uri, config):
+        with self._lock:
+            session = self._sessions.get(uri)
+            if session is None:
+                session = DeviceSession(uri, self.open_device(uri))
+                self._sessions[uri] = session
+        if not uri.startswith("replay:"):
+            with session.lock:
+                session.configure(PLUTO_CONFIG if config is None else {**PLUTO_CONFIG, **config})
+        return session
+
+    def get(self, uri=None, config=None):
+        return self.session(uri, config).sdr
+
+    def run(self, job, uris=None, config=None):
+        # Run job(sdr) on several devices in parallel; each device runs one job at a time
+        if uris is None:
+            uris = sorted(self.discover())
+        sessions = [self.session(uri, config) for uri in uris]
+
+        def run_on(session):
+            with session.lock:
+                return job(session.sdr)
+
+        with ThreadPoolExecutor(max_workers=max(len(sessions), 1)) as executor:
+            results = list(executor.map(run_on, sessions))
+        return dict(zip(uris, results))
+
+    def release(self, uri):
+        # Waits for a run in progress on the device, then tears its buffers down
+        with self._lock:
+            session = self._sessions.pop(uri, None)
+        if session is not None:
+            with session.lock:
+                close_pluto(session.sdr)
+                session.sdr = None
+
+    def close(self):
+        for uri in list(self._sessions):
+            self.release(uri)
+
+    def __len__(self):
+        return len(self._sessions)
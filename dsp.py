@@ -0,0 +1,304 @@
+import cmath
+from functools import lru_cache
+import numpy as np
+from scipy import signal
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+# Per-sample second-order PLL, identical to the original loop in pluto.pll.
+# Runs as plain Python, or compiled when numba is installed.
+def _pll_loop(x, out, phase, integrator, freq, Kp, Ki, fs):
+    for i in range(x.shape[0]):
+        phase_error = cmath.phase(x[i] * cmath.exp(-1j * phase))
+        integrator += Ki * phase_error
+        freq = integrator + Kp * phase_error
+        phase += freq / fs
+        out[i] = x[i] * cmath.exp(-1j * phase)
+    return phase, integrator, freq
+
+_pll_loop_jit = njit(cache=True)(_pll_loop) if njit is not None else None
+
+# Precision modes of the receive chain. Every stage keeps the precision of its
+# input (float32/complex64 in, complex64 out), so IQ cast once to complex64
+# stays single precision through AGC, PLL and filtering. Stages also take an
+# out= buffer, which may be the input itself to process in place.
+PRECISIONS = {"single": np.complex64, "double": np.complex128}
+BLOCK_SIZE = 1 << 16  # chunk size bounding the temporaries of out= processing
+BLOCK_ENGINE_MAX_STEP = 0.01  # validity limit of CarrierRecovery(engine="block")
+
+def complex_dtype(precision):
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}")
+    return np.dtype(PRECISIONS[precision])
+
+def _single(data):
+    return data.dtype in (np.float32, np.complex64)
+
+
+class CarrierRecovery:
+    # Streaming carrier recovery with the same loop filter as pluto.pll.
+    # Loop state (phase, integrator, frequency) is kept between process() calls
+    # so consecutive sdr.rx() buffers are corrected as one continuous stream.
+    #
+    # engine="jit" runs the exact per-sample loop compiled with numba,
+    # engine="loop" runs it as plain Python (about 1 MS/s). "auto" picks jit
+    # when numba is installed; without it, block inside the regime where block
+    # is valid (e.g. the default settings at 6 MS/s) and loop outside it.
+    #
+    # engine="block" is an approximation of the same loop. It evaluates
+    # the phase detector for a whole block against the phase ramp predicted at
+    # the start of the block, then integrates the loop filter with cumulative
+    # sums. That only holds while the loop barely moves within a block, i.e.
+    # (Kp + Ki * block_size) * block_size / fs stays below BLOCK_ENGINE_MAX_STEP
+    # (e.g. bandwidth 0.01 at 6 MS/s with 4096-sample blocks); outside that
+    # regime it diverges from the per-sample loop and is rejected.
+    #
+    # Output is complex64 for single-precision input and complex128 otherwise;
+    # the loop state is always carried in double precision.
+    def __init__(self, fs, loop_bandwidth=0.01, block_size=4096, engine="auto"):
+        if engine not in ("auto", "block", "jit", "loop"):
+            raise ValueError(f"Unknown PLL engine: {engine}")
+        if engine == "jit" and _pll_loop_jit is None:
+            raise ImportError("engine='jit' requires numba")
+
+        self.fs = float(fs)
+        self.Kp = 2 * np.pi * loop_bandwidth
+        self.Ki = (self.Kp ** 2) / 4
+        self.block_size = int(block_size)
+        if engine == "auto":
+            if _pll_loop_jit is not None:
+                engine = "jit"
+            else:
+                engine = "block" if self.block_step <= BLOCK_ENGINE_MAX_STEP else "loop"
+        self.engine = engine
+        if engine == "block" and self.block_step > BLOCK_ENGINE_MAX_STEP:
+            raise ValueError(f"engine='block' needs (Kp + Ki * block_size) * block_size / fs <= "
+                             f"{BLOCK_ENGINE_MAX_STEP}, got {self.block_step:.3g}; use a smaller "
+                             f"block_size or engine='loop'")
+        self._ramp = np.arange(self.block_size, dtype=np.float64)
+        self.reset()
+
+    @property
+    def block_step(self):
+        # How far the loop can move within one block, relative to a sample period
+        return (self.Kp + self.Ki * self.block_size) * self.block_size / self.fs
+
+    def reset(self):
+        self.phase = 0.0
+        self.integrator = 0.0
+        self.freq_estimate = 0.0
+
+    def process(self, input_signal, out=None):
+        x = np.asarray(input_signal)
+        x = x.astype(np.complex64 if _single(x) else np.complex128, copy=False)
+        output_signal = np.empty_like(x) if out is None else out
+
+        if self.engine == "block":
+            for start in range(0, len(x), self.block_size):
+                stop = start + self.block_size
+                self._process_block(x[start:stop], output_signal[start:stop])
+        else:
+            loop = _pll_loop_jit if self.engine == "jit" else _pll_loop
+            self.phase, self.integrator, self.freq_estimate = loop(
+                x, output_signal, self.phase, self.integrator, self.freq_estimate,
+                self.Kp, self.Ki, self.fs)
+            self.phase = float(np.mod(self.phase, 2 * np.pi))
+
+        return output_signal
+
+    def _process_block(self, x, out):
+        ramp = self._ramp[:len(x)]
+        predicted_phase = self.phase + ramp * (self.freq_estimate / self.fs)
+        # angle(x) - predicted, wrapped: avoids one complex exp per block
+        phase_error = np.angle(x).astype(np.float64)
+        phase_error -= predicted_phase
+        phase_error += np.pi
+        np.mod(phase_error, 2 * np.pi, out=phase_error)
+        phase_error -= np.pi
+
+        integrator = np.cumsum(phase_error)
+        integrator *= self.Ki
+        integrator += self.integrator
+        freq = self.Kp * phase_error
+        freq += integrator
+        phase = np.cumsum(freq)
+        phase /= self.fs
+        phase += self.phase
+
+        # build the rotor from cos/sin at the input's precision
+        real_dtype = x.real.dtype
+        rotor = np.empty(len(x), dtype=x.dtype)
+        rotor.real = np.cos(phase.astype(real_dtype))
+        rotor.imag = np.sin(phase.astype(real_dtype))
+        np.negative(rotor.imag, out=rotor.imag)
+        np.multiply(x, rotor, out=out)
+
+        self.phase = float(np.mod(phase[-1], 2 * np.pi))
+        self.integrator = float(integrator[-1])
+        self.freq_estimate = float(freq[-1])
+
+
+def pll(input_signal, fs, loop_bandwidth=0.01, engine="auto", out=None):
+    recovery = CarrierRecovery(fs, loop_bandwidth=loop_bandwidth, engine=engine)
+    output_signal = recovery.process(input_signal, out=out)
+    return output_signal, recovery.freq_estimate
+
+@lru_cache(maxsize=32)
+def butter_lowpass_sos(cutoff_freq, fs, order=5):
+    nyquist = 0.5 * fs
+    normal_cutoff = cutoff_freq / nyquist
+    sos = signal.butter(order, normal_cutoff, btype='low', analog=False, output='sos')
+    sos.flags.writeable = False
+    return sos
+
+@lru_cache(maxsize=32)
+def fir_lowpass_taps(cutoff_freq, fs, num_taps=255):
+    taps = signal.firwin(num_taps, cutoff_freq, fs=fs)
+    taps.flags.writeable = False
+    return taps
+
+
+class LowPassFilter:
+    # Streaming low-pass filter. The design is cached per (cutoff, fs, order)
+    # and the filter state is carried between process() calls, so filtering a
+    # capture chunk by chunk gives the same output as filtering it in one go.
+    #
+    # method="iir" is the Butterworth design used by low_pass_filter, run in
+    # second-order sections. method="fir" is a linear-phase windowed FIR; chunks
+    # of at least fft_threshold samples are filtered by FFT overlap-save,
+    # shorter ones by direct convolution. Both paths carry the last
+    # num_taps - 1 input samples as state.
+    def __init__(self, cutoff_freq, fs, order=5, method="iir", num_taps=255, fft_threshold=16384):
+        if method not in ("iir", "fir"):
+            raise ValueError(f"Unknown filter method: {method}")
+        self.method = method
+        self.fft_threshold = fft_threshold
+        if method == "iir":
+            self.sos = butter_lowpass_sos(float(cutoff_freq), float(fs), order)
+        else:
+            self.taps = fir_lowpass_taps(float(cutoff_freq), float(fs), num_taps)
+            # FFT block of at least 8x the filter length keeps the overlap small
+            self.fft_size = 1 << int(np.ceil(np.log2(8 * num_taps)))
+            self._response = np.fft.fft(self.taps, self.fft_size)
+        self.reset()
+
+    def reset(self):
+        self._state = None
+
+    def process(self, data, out=None):
+        data = np.asarray(data)
+        filter_chunk = self._process_iir if self.method == "iir" else self._process_fir
+        if out is None:
+            return filter_chunk(data)
+
+        # Filter block by block into out with the state carried over, as
+        # low_pass_filter does, so only one block of temporaries is alive
+        for start in range(0, len(data), BLOCK_SIZE):
+            stop = start + BLOCK_SIZE
+            out[start:stop] = filter_chunk(data[start:stop])
+        return out
+
+    def _process_iir(self, data):
+        sos = self.sos.astype(np.float32) if _single(data) else self.sos
+        dtype = np.result_type(sos, data)
+        if self._state is None:
+            self._state = np.zeros((sos.shape[0], 2), dtype=dtype)
+        output, self._state = signal.sosfilt(sos, data, zi=self._state.astype(dtype, copy=False))
+        return output
+
+    def _process_fir(self, data):
+        dtype = np.result_type(np.float32 if _single(data) else self.taps.dtype, data)
+        history_length = len(self.taps) - 1
+        if self._state is None:
+            self._state = np.zeros(history_length, dtype=dtype)
+        extended = np.concatenate((self._state.astype(dtype, copy=False), data))
+        self._state = extended[len(extended) - history_length:]
+
+        if len(data) < self.fft_threshold:
+            return np.convolve(extended, self.taps, mode='valid').astype(dtype, copy=False)
+        return self._overlap_save(extended, len(data), dtype)
+
+    def _overlap_save(self, extended, num_outputs, dtype):
+        history_length = len(self.taps) - 1
+        step = self.fft_size - history_length
+        num_frames = -(-num_outputs // step)
+
+        # Frame the input into overlapping blocks and filter them all in one FFT
+        padded = np.zeros((num_frames - 1) * step + self.fft_size, dtype=dtype)
+        padded[:len(extended)] = extended
+        frames = sliding_window_view(padded, self.fft_size)[::step]
+        filtered = np.fft.ifft(np.fft.fft(frames, axis=1) * self._response, axis=1)[:, history_length:]
+
+        output = filtered.reshape(-1)[:num_outputs]
+        if np.dtype(dtype).kind != 'c':
+            output = output.real
+        return output.astype(dtype, copy=False)
+
+
+def low_pass_filter(data, cutoff_freq, fs, order=5, out=None):
+    data = np.asarray(data)
+    sos = butter_lowpass_sos(float(cutoff_freq), float(fs), order)
+    if _single(data):
+        sos = sos.astype(np.float32)
+    if out is None:
+        return signal.sosfilt(sos, data)
+
+    # Filter block by block with the state carried over, so only one block of
+    # temporaries is alive at a time
+    zi = np.zeros((sos.shape[0], 2), dtype=np.result_type(sos, data))
+    for start in range(0, len(data), BLOCK_SIZE):
+        stop = start + BLOCK_SIZE
+        out[start:stop], zi = signal.sosfilt(sos, data[start:stop], zi=zi)
+    return out
+
+def _peak(signal):
+    return max(np.max(np.abs(signal[start:start + BLOCK_SIZE])) for start in range(0, len(signal), BLOCK_SIZE))
+
+def apply_agc(signal, target_level=0.1, out=None):
+    signal = np.asarray(signal)
+    gain = target_level / _peak(signal)
+    return np.multiply(signal, gain, out=out)
+
+
+class AutomaticGainControl:
+    # Streaming counterpart of apply_agc. The peak level is tracked across
+    # process() calls, following a louder buffer at once and decaying by
+    # `decay` per buffer otherwise, and the gain is ramped linearly from where
+    # the previous buffer ended, so there is no gain step at buffer boundaries.
+    # The first buffer gets exactly the gain apply_agc would give it.
+    def __init__(self, target_level=0.1, decay=0.9):
+        self.target_level = target_level
+        self.decay = decay
+        self.reset()
+
+    def reset(self):
+        self.level = None
+        self.gain = None
+
+    def process(self, signal, out=None):
+        signal = np.asarray(signal)
+        if len(signal) == 0:
+            return np.multiply(signal, 1, out=out)
+        peak = float(_peak(signal))
+        self.level = peak if self.level is None else max(peak, self.decay * self.level)
+        gain = self.target_level / self.level if self.level > 0 else (self.gain or 1.0)
+        start_gain = gain if self.gain is None else self.gain
+        self.gain = gain
+
+        if start_gain == gain:
+            return np.multiply(signal, signal.real.dtype.type(gain), out=out)
+        if out is None:
+            out = np.empty_like(signal, dtype=np.result_type(signal, signal.real.dtype))
+        # Gain for sample i is start_gain + (gain - start_gain) * (i + 1) / n
+        n = len(signal)
+        step = (gain - start_gain) / n
+        for start in range(0, n, BLOCK_SIZE):
+            stop = min(start + BLOCK_SIZE, n)
+            ramp = start_gain + step * np.arange(start + 1, stop + 1, dtype=signal.real.dtype)
+            np.multiply(signal[start:stop], ramp, out=out[start:stop])
+        return out
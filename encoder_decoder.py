@@ -1,29 +1,107 @@
 import numpy as np
 
+G = np.array([[1, 0, 0, 0, 0, 1, 1],
+              [0, 1, 0, 0, 1, 0, 1],
+              [0, 0, 1, 0, 1, 1, 0],
+              [0, 0, 0, 1, 1, 1, 1]])
+
+H = np.array([[1, 0, 1, 0, 1, 0, 1],
+              [0, 1, 1, 0, 0, 1, 1],
+              [0, 0, 0, 1, 1, 1, 1]])
+
+# Codewords are handled as 7-bit integers (first bit = MSB) and data as 4-bit nibbles
+CODEWORD_SHIFTS = np.arange(6, -1, -1)
+NIBBLE_SHIFTS = np.arange(3, -1, -1)
+
+def _build_tables():
+    nibble_bits = (np.arange(16)[:, None] >> NIBBLE_SHIFTS) & 1
+    encode_table = (np.dot(nibble_bits, G) % 2) @ (1 << CODEWORD_SHIFTS)
+
+    # For every possible received word, flip the bit whose column of H matches
+    # the syndrome and keep the 4 data bits of the corrected codeword
+    words = (np.arange(128)[:, None] >> CODEWORD_SHIFTS) & 1
+    syndromes = np.dot(words, H.T) % 2
+    corrected = words.copy()
+    for position, column in enumerate(H.T):
+        corrected[np.all(syndromes == column, axis=1), position] ^= 1
+    decode_table = corrected[:, :4] @ (1 << NIBBLE_SHIFTS)
+
+    return encode_table.astype(np.uint8), decode_table.astype(np.uint8)
+
+ENCODE_TABLE, DECODE_TABLE = _build_tables()
+ENCODE_TABLE.flags.writeable = False
+DECODE_TABLE.flags.writeable = False
+
 def hamming_encode(data):
+    data = np.asarray(data)
     # Pad the data if it's not a multiple of 4 bits
     if len(data) % 4 != 0:
         padding_length = 4 - (len(data) % 4)
         data = np.concatenate((data, np.zeros(padding_length, dtype=int)))
-    
-    G = np.array([[1, 0, 0, 0, 0, 1, 1],
-                  [0, 1, 0, 0, 1, 0, 1],
-                  [0, 0, 1, 0, 1, 1, 0],
-                  [0, 0, 0, 1, 1, 1, 1]])
-    
-    encoded = np.dot(data.reshape(-1, 4), G) % 2
-    return encoded.flatten()
+
+    codewords = ENCODE_TABLE[data.reshape(-1, 4) @ (1 << NIBBLE_SHIFTS)]
+    return ((codewords[:, None] >> CODEWORD_SHIFTS) & 1).astype(int).reshape(-1)
 
 def hamming_decode(encoded_data):
-    H = np.array([[1, 0, 1, 0, 1, 0, 1], 
-                  [0, 1, 1, 0, 0, 1, 1], 
-                  [0, 0, 0, 1, 1, 1, 1]])
-    
-    decoded = []
-    for i in range(0, len(encoded_data), 7):
-        syndrome = np.dot(H, encoded_data[i:i+7]) % 2
-        syndrome_decimal = int(''.join(map(str, syndrome)), 2)
-        if syndrome_decimal != 0:
-            encoded_data[i+syndrome_decimal-1] ^= 1
-        decoded.extend([encoded_data[i], encoded_data[i+1], encoded_data[i+2], encoded_data[i+3]])
-    return np.array(decoded)
+    encoded_data = np.asarray(encoded_data)
+    num_codewords = len(encoded_data) // 7
+
+    codewords = encoded_data[:7 * num_codewords].reshape(-1, 7) @ (1 << CODEWORD_SHIFTS)
+    nibbles = DECODE_TABLE[codewords]
+    return ((nibbles[:, None] >> NIBBLE_SHIFTS) & 1).astype(int).reshape(-1)
+
+# Packed-bit interface: data and codewords travel as np.packbits-style uint8
+# buffers (MSB first), so no stage ever holds one integer per bit.
+
+def hamming_encode_packed(packed_data, num_bits=None):
+    packed_data = np.asarray(packed_data, dtype=np.uint8)
+    if num_bits is None:
+        num_bits = 8 * len(packed_data)
+    num_codewords = -(-num_bits // 4)
+
+    nibbles = _bytes_to_nibbles(packed_data, num_codewords)
+    if num_bits % 4:
+        # Zero the bits past num_bits in the last nibble, like the bit-level padding
+        nibbles[-1] &= (0xF << (4 - num_bits % 4)) & 0xF
+
+    return _pack_codewords(ENCODE_TABLE[nibbles]), 7 * num_codewords
+
+def hamming_decode_packed(packed_encoded, num_bits):
+    num_codewords = num_bits // 7
+    codewords = _unpack_codewords(np.asarray(packed_encoded, dtype=np.uint8), num_codewords)
+    return _nibbles_to_bytes(DECODE_TABLE[codewords]), 4 * num_codewords
+
+def _bytes_to_nibbles(packed, num_nibbles):
+    nibbles = np.empty((len(packed), 2), dtype=np.uint8)
+    np.right_shift(packed, 4, out=nibbles[:, 0])
+    np.bitwise_and(packed, 0xF, out=nibbles[:, 1])
+    return nibbles.reshape(-1)[:num_nibbles].copy()
+
+def _nibbles_to_bytes(nibbles):
+    if len(nibbles) % 2:
+        nibbles = np.append(nibbles, np.uint8(0))
+    return (nibbles[0::2] << 4) | nibbles[1::2]
+
+# Eight 7-bit codewords fill exactly seven bytes, so they are packed through
+# the low 56 bits of a big-endian uint64
+_GROUP_SHIFTS = (7 * np.arange(7, -1, -1)).astype(np.uint64)
+
+def _pack_codewords(codewords):
+    num_codewords = len(codewords)
+    groups = np.zeros(-(-num_codewords // 8) * 8, dtype=np.uint64)
+    groups[:num_codewords] = codewords
+    words = np.bitwise_or.reduce(groups.reshape(-1, 8) << _GROUP_SHIFTS, axis=1)
+    packed = words.astype('>u8').view(np.uint8).reshape(-1, 8)[:, 1:].reshape(-1)
+    return packed[:-(-7 * num_codewords // 8)]
+
+def _unpack_codewords(packed, num_codewords):
+    num_groups = -(-num_codewords // 8)
+    padded = np.zeros(7 * num_groups, dtype=np.uint8)
+    num_bytes = min(len(packed), len(padded))
+    padded[:num_bytes] = packed[:num_bytes]
+
+    buffer = np.zeros((num_groups, 8), dtype=np.uint8)
+    buffer[:, 1:] = padded.reshape(-1, 7)
+    words = buffer.view('>u8').reshape(-1, 1).astype(np.uint64)
+    codewords = (words >> _GROUP_SHIFTS) & np.uint64(0x7F)
+    return codewords.reshape(-1)[:num_codewords].astype(np.uint8)
@@ -0,0 +1,72 @@
+import time
+import numpy as np
+
+
+class FakePluto:
+    # Stand-in for adi.Pluto that produces synthetic IQ, so the receive chain
+    # can be exercised without hardware. While a TX buffer is loaded, rx()
+    # loops it back (cyclically, like tx_cyclic_buffer); otherwise it returns
+    # random QPSK symbols. A carrier offset and AWGN are applied in both cases.
+    def __init__(self, uri="fake:", freq_offset=1e3, snr_db=20, samples_per_symbol=8,
+                 realtime=False, seed=0):
+        self.uri = uri
+        self.rx_rf_bandwidth = 4000000
+        self.sample_rate = 6000000
+        self.rx_lo = 500000000
+        self.tx_lo = 500000000
+        self.tx_cyclic_buffer = True
+        self.tx_hardwaregain_chan0 = -10
+        self.gain_control_mode_chan0 = "manual"
+        self.rx_hardwaregain_chan0 = 50
+        self.rx_enabled_channels = [0]
+        self.tx_enabled_channels = [0]
+        self.rx_buffer_size = 1024
+
+        self.freq_offset = freq_offset
+        self.snr_db = snr_db
+        self.samples_per_symbol = samples_per_symbol
+        self.realtime = realtime
+        self.rx_calls = 0
+        self._rng = np.random.default_rng(seed)
+        self._tx_buffer = None
+        self._sample_index = 0
+        self._stream_start = None
+        self._rotor = None
+
+    def tx(self, data):
+        data = np.asarray(data, dtype=np.complex128)
+        peak = np.max(np.abs(data))
+        self._tx_buffer = data / peak if peak > 0 else data
+
+    def tx_destroy_buffer(self):
+        self._tx_buffer = None
+
+    def rx(self):
+        n = int(self.rx_buffer_size)
+        index = self._sample_index + np.arange(n)
+
+        if self._tx_buffer is not None:
+            iq = np.take(self._tx_buffer, index, mode='wrap')
+        else:
+            num_symbols = -(-n // self.samples_per_symbol)
+            bits = self._rng.integers(0, 2, size=(num_symbols, 2))
+            symbols = ((2 * bits[:, 0] - 1) + 1j * (2 * bits[:, 1] - 1)) / np.sqrt(2)
+            iq = np.repeat(symbols, self.samples_per_symbol)[:n]
+
+        # Carrier offset: a cached per-buffer rotor times the rotation accumulated so far
+        if self._rotor is None or len(self._rotor) != n:
+            self._rotor = np.exp(2j * np.pi * self.freq_offset * np.arange(n) / self.sample_rate)
+        iq = iq * self._rotor * np.exp(2j * np.pi * self.freq_offset * self._sample_index / self.sample_rate)
+        noise_std = np.sqrt(np.mean(np.abs(iq) ** 2) / (2 * 10 ** (self.snr_db / 10)))
+        iq += noise_std * self._rng.standard_normal(2 * n, dtype=np.float32).view(np.complex64)
+
+        self._sample_index += n
+        self.rx_calls += 1
+        if self.realtime:
+            # Pace against the stream clock, like the radio delivering samples
+            if self._stream_start is None:
+                self._stream_start = time.perf_counter()
+            delay = self._stream_start + self._sample_index / self.sample_rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return iq * 2**11
@@ -0,0 +1,325 @@
+import zlib
+from functools import lru_cache
+import numpy as np
+from encoder_decoder import hamming_encode, hamming_decode
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Forward error correction behind one interface. Every codec encodes and
+# decodes batches of equal-length frames, one frame per row:
+#   encode_batch(frames)                      -> (F, encoded_length(n)) bits
+#   decode_batch(received, num_bits, soft)    -> (F, num_bits) bits, (F,) ok flags
+# With soft=True the received values are LLRs, positive favouring bit 1 (the
+# convention of demodulation.qpsk_demodulate*). Codecs are built from a spec
+# string such as "hamming", "conv:3/4" or "crc32+conv:1/2+interleaver:32";
+# "+" chains codecs in encoding order, so the rate is chosen per run.
+
+CODECS = {}
+
+def register_codec(name):
+    def decorator(factory):
+        CODECS[name] = factory
+        return factory
+    return decorator
+
+def make_codec(spec="hamming"):
+    if isinstance(spec, Codec):
+        return spec
+    return _make_codec(spec)
+
+@lru_cache(maxsize=32)
+def _make_codec(spec):
+    codecs = []
+    for part in spec.split("+"):
+        name, _, argument = part.strip().partition(":")
+        if name not in CODECS:
+            raise ValueError(f"Unknown codec: {name}")
+        codecs.append(CODECS[name](argument) if argument else CODECS[name]())
+    return codecs[0] if len(codecs) == 1 else FECChain(codecs)
+
+def _hard_bits(values, soft):
+    values = np.asarray(values)
+    return (values > 0).astype(int) if soft else values.astype(int)
+
+
+class Codec:
+    name = "none"
+    rate = 1.0
+    soft_output = False  # deinterleave() passes soft values through (interleavers)
+
+    def encoded_length(self, num_bits):
+        return num_bits
+
+    def encode(self, bits):
+        return self.encode_batch(np.asarray(bits)[None, :])[0]
+
+    def decode(self, received, num_bits, soft=False):
+        return self.decode_batch(np.asarray(received)[None, :], num_bits, soft)[0][0]
+
+    def encode_batch(self, frames):
+        return np.asarray(frames).astype(int)
+
+    def decode_batch(self, received, num_bits, soft=False):
+        bits = _hard_bits(received, soft)[:, :num_bits]
+        return bits, np.ones(len(bits), dtype=bool)
+
+register_codec("none")(Codec)
+
+
+@register_codec("hamming")
+class HammingCodec(Codec):
+    name = "hamming"
+    rate = 4 / 7
+
+    def encoded_length(self, num_bits):
+        return 7 * -(-num_bits // 4)
+
+    def encode_batch(self, frames):
+        frames = np.asarray(frames)
+        padded = np.zeros((len(frames), 4 * -(-frames.shape[1] // 4)), dtype=int)
+        padded[:, :frames.shape[1]] = frames
+        return hamming_encode(padded.reshape(-1)).reshape(len(frames), -1)
+
+    def decode_batch(self, received, num_bits, soft=False):
+        bits = _hard_bits(received, soft)
+        decoded = hamming_decode(bits.reshape(-1)).reshape(len(bits), -1)[:, :num_bits]
+        return decoded, np.ones(len(bits), dtype=bool)
+
+
+# Puncturing patterns for the rate-1/2 mother code (one column per input bit,
+# one row per generator), as used with the K=7 code in IEEE 802.11a
+PUNCTURE_PATTERNS = {
+    "1/2": ((1,), (1,)),
+    "2/3": ((1, 1), (1, 0)),
+    "3/4": ((1, 1, 0), (1, 0, 1)),
+    "5/6": ((1, 1, 0, 1, 0), (1, 0, 1, 0, 1)),
+}
+
+@lru_cache(maxsize=8)
+def _trellis(constraint_length, polynomials):
+    # The encoder register holds the current bit in its MSB and the previous
+    # K-1 bits below it; the state is the register without its LSB. State ns
+    # is entered from ((ns << 1) | x) & mask for x in {0, 1}, with register
+    # (ns << 1) | x, and the input bit is the MSB of ns.
+    num_states = 1 << (constraint_length - 1)
+    registers = (np.arange(num_states)[:, None] << 1) | np.arange(2)
+    predecessors = registers & (num_states - 1)
+    outputs = np.array([[[bin(register & poly).count("1") & 1 for poly in polynomials]
+                         for register in row] for row in registers.tolist()])
+    combos = outputs @ (1 << np.arange(len(polynomials)))  # index into the branch metric table
+    signs = 2 * ((np.arange(1 << len(polynomials))[:, None] >> np.arange(len(polynomials))) & 1) - 1
+    for array in (predecessors, combos, signs):
+        array.flags.writeable = False
+    return predecessors, combos, signs
+
+
+@register_codec("conv")
+class ConvolutionalCodec(Codec):
+    # Zero-terminated convolutional code (default K=7, generators 171/133 octal)
+    # with optional puncturing, decoded by a Viterbi decoder that runs the
+    # add-compare-select step for all states of all frames at once and
+    # accepts hard bits or LLRs; punctured positions decode as erasures.
+    def __init__(self, rate="1/2", constraint_length=7, polynomials=(0o171, 0o133)):
+        if rate not in PUNCTURE_PATTERNS:
+            raise ValueError(f"Unsupported convolutional code rate: {rate}")
+        self.name = f"conv:{rate}"
+        self.constraint_length = constraint_length
+        self.polynomials = tuple(polynomials)
+        self.puncture = np.array(PUNCTURE_PATTERNS[rate], dtype=bool)
+        numerator, denominator = map(int, rate.split("/"))
+        self.rate = numerator / denominator
+        # Generator taps: output j at time t is the XOR of b[t - i] where tap i is set
+        self.taps = np.array([[(poly >> (constraint_length - 1 - i)) & 1 for i in range(constraint_length)]
+                              for poly in self.polynomials], dtype=bool)
+
+    def _mask(self, num_steps):
+        # (num_steps, num_outputs): which coded bits survive puncturing
+        period = self.puncture.shape[1]
+        return self.puncture[:, np.arange(num_steps) % period].T
+
+    def encoded_length(self, num_bits):
+        return int(self._mask(num_bits + self.constraint_length - 1).sum())
+
+    def encode_batch(self, frames):
+        frames = np.asarray(frames).astype(np.uint8)
+        num_frames, num_bits = frames.shape
+        memory = self.constraint_length - 1
+        num_steps = num_bits + memory  # including the zero tail
+        padded = np.zeros((num_frames, memory + num_steps), dtype=np.uint8)
+        padded[:, memory:memory + num_bits] = frames
+
+        coded = np.zeros((num_frames, num_steps, len(self.polynomials)), dtype=np.uint8)
+        for j, taps in enumerate(self.taps):
+            for i in np.flatnonzero(taps):
+                coded[:, :, j] ^= padded[:, memory - i:memory - i + num_steps]
+        return coded[:, self._mask(num_steps)].astype(int)
+
+    def decode_batch(self, received, num_bits, soft=False):
+        received = np.asarray(received, dtype=float)
+        num_frames = len(received)
+        memory = self.constraint_length - 1
+        num_steps = num_bits + memory
+        num_states = 1 << memory
+        _, combos, signs = _trellis(self.constraint_length, self.polynomials)
+
+        # Depuncture into (frames, steps, outputs) correlation weights; erasures stay 0
+        weights = np.zeros((num_frames, num_steps, len(self.polynomials)))
+        weights[:, self._mask(num_steps)] = received if soft else 2 * received - 1
+        branch_metrics = weights @ signs.T  # (frames, steps, 2**outputs)
+
+        decisions = np.empty((num_steps, num_frames, num_states), dtype=np.uint8)
+        if _viterbi_forward_jit is not None:
+            _viterbi_forward_jit(branch_metrics, np.ascontiguousarray(combos), decisions)
+        else:
+            _viterbi_forward_numpy(branch_metrics, combos, decisions)
+
+        # Trace back from the all-zero state the tail leaves the encoder in
+        rows = np.arange(num_frames)
+        state = np.zeros(num_frames, dtype=np.int64)
+        bits = np.empty((num_frames, num_steps), dtype=int)
+        for t in range(num_steps - 1, -1, -1):
+            bits[:, t] = state >> (memory - 1)
+            state = ((state << 1) | decisions[t, rows, state]) & (num_states - 1)
+        return bits[:, :num_bits], np.ones(num_frames, dtype=bool)
+
+
+# Add-compare-select over the trellis, filling decisions[t, frame, state] with
+# the survivor bit x of the predecessor ((state % half) << 1) | x. The numpy
+# version works on the butterfly structure (states s and s + half share a
+# predecessor pair) for all frames at once; the per-state loop is compiled
+# when numba is installed.
+def _viterbi_forward(branch_metrics, combos, decisions):
+    num_steps, num_frames, num_states = decisions.shape
+    half = num_states // 2
+    metrics = np.empty(num_states)
+    updated = np.empty(num_states)
+    for f in range(num_frames):
+        metrics[:] = -1e300
+        metrics[0] = 0.0
+        for t in range(num_steps):
+            for state in range(num_states):
+                predecessor = (state % half) * 2
+                m0 = metrics[predecessor] + branch_metrics[f, t, combos[state, 0]]
+                m1 = metrics[predecessor + 1] + branch_metrics[f, t, combos[state, 1]]
+                decisions[t, f, state] = m1 > m0
+                updated[state] = m1 if m1 > m0 else m0
+            best = updated.max()
+            for state in range(num_states):
+                metrics[state] = updated[state] - best
+
+_viterbi_forward_jit = njit(cache=True)(_viterbi_forward) if njit is not None else None
+
+def _viterbi_forward_numpy(branch_metrics, combos, decisions, chunk_size=256):
+    num_steps, num_frames, num_states = decisions.shape
+    half = num_states // 2
+    metrics = np.full((num_frames, num_states), -np.inf)
+    metrics[:, 0] = 0.0
+    for start in range(0, num_steps, chunk_size):
+        chunk = branch_metrics[:, start:start + chunk_size][:, :, combos]  # (frames, steps, states, 2)
+        for k in range(chunk.shape[1]):
+            pairs = metrics.reshape(num_frames, 1, half, 2)
+            candidates = (pairs + chunk[:, k].reshape(num_frames, 2, half, 2)).reshape(num_frames, num_states, 2)
+            np.greater(candidates[:, :, 1], candidates[:, :, 0], out=decisions[start + k])
+            metrics = np.maximum(candidates[:, :, 0], candidates[:, :, 1])
+        metrics -= metrics.max(axis=1, keepdims=True)
+
+
+@register_codec("crc32")
+class CRC32Codec(Codec):
+    # Appends the CRC-32 (zlib) of the frame's packed bytes; decoding strips it
+    # and reports in `ok` whether it still matches
+    name = "crc32"
+
+    def encoded_length(self, num_bits):
+        return num_bits + 32
+
+    @staticmethod
+    def _crc_bits(frames):
+        crcs = np.array([zlib.crc32(np.packbits(frame).tobytes()) for frame in frames], dtype='>u4')
+        return np.unpackbits(crcs.view(np.uint8).reshape(-1, 4), axis=1).astype(int)
+
+    def encode_batch(self, frames):
+        frames = np.asarray(frames).astype(int)
+        return np.concatenate((frames, self._crc_bits(frames.astype(np.uint8))), axis=1)
+
+    def decode_batch(self, received, num_bits, soft=False):
+        bits = _hard_bits(received, soft)
+        data = bits[:, :num_bits]
+        ok = np.all(self._crc_bits(data.astype(np.uint8)) == bits[:, num_bits:num_bits + 32], axis=1)
+        return data, ok
+
+
+@lru_cache(maxsize=32)
+def _interleaver_permutation(num_bits, depth):
+    # Write the frame row by row into rows of `depth` bits and read it column by
+    # column; the last row may be short, so the length is preserved
+    num_rows = -(-num_bits // depth)
+    order = np.arange(num_rows * depth).reshape(num_rows, depth).T.reshape(-1)
+    permutation = order[order < num_bits]
+    permutation.flags.writeable = False
+    return permutation
+
+
+@register_codec("interleaver")
+class BlockInterleaver(Codec):
+    # Consecutive channel bits come from input bits `depth` apart, so a burst
+    # of errors is spread across the frame before the inner decoder sees it
+    soft_output = True
+
+    def __init__(self, depth=32):
+        self.depth = int(depth)
+        self.name = f"interleaver:{self.depth}"
+
+    def encode_batch(self, frames):
+        frames = np.asarray(frames)
+        return frames[:, _interleaver_permutation(frames.shape[1], self.depth)]
+
+    def deinterleave(self, received, num_bits):
+        received = np.asarray(received)
+        values = np.empty_like(received)
+        values[:, _interleaver_permutation(received.shape[1], self.depth)] = received
+        return values[:, :num_bits]
+
+    def decode_batch(self, received, num_bits, soft=False):
+        # Decoded output is bits, also for soft input; inside an FECChain the
+        # soft values reach the next decoder through deinterleave() instead
+        return _hard_bits(self.deinterleave(received, num_bits), soft), np.ones(len(received), dtype=bool)
+
+
+class FECChain(Codec):
+    def __init__(self, codecs):
+        self.codecs = list(codecs)
+        self.name = "+".join(codec.name for codec in self.codecs)
+        self.rate = float(np.prod([codec.rate for codec in self.codecs]))
+
+    def _lengths(self, num_bits):
+        # Input length of every codec in encoding order
+        lengths = [num_bits]
+        for codec in self.codecs[:-1]:
+            lengths.append(codec.encoded_length(lengths[-1]))
+        return lengths
+
+    def encoded_length(self, num_bits):
+        return self.codecs[-1].encoded_length(self._lengths(num_bits)[-1])
+
+    def encode_batch(self, frames):
+        for codec in self.codecs:
+            frames = codec.encode_batch(frames)
+        return frames
+
+    def decode_batch(self, received, num_bits, soft=False):
+        ok = np.ones(len(received), dtype=bool)
+        lengths = self._lengths(num_bits)
+        for index in reversed(range(len(self.codecs))):
+            codec = self.codecs[index]
+            if codec.soft_output and index > 0:
+                # Inner interleavers hand soft values on to the next decoder
+                received = codec.deinterleave(received, lengths[index])
+                continue
+            received, codec_ok = codec.decode_batch(received, lengths[index], soft)
+            ok &= codec_ok
+            soft = False
+        return received, ok
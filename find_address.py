@@ -1,10 +1,10 @@
-import iio
+from device_pool import discover_devices
 
-# List all contexts (connected devices)
-contexts = iio.scan_contexts()
+# List all PlutoSDR contexts (connected devices)
+devices = discover_devices()
 print("Available PlutoSDR Devices:")
-if not contexts:
+if not devices:
     print("No devices found.")
 else:
-    for uri, description in contexts.items():
+    for uri, description in devices.items():
         print(f"URI: {uri} - Description: {description}")
@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+# SigMF-style IQ recordings: raw little-endian complex64 samples in
+# <base>.sigmf-data and a JSON sidecar in <base>.sigmf-meta holding the
+# sample rate, LO, gain and one capture segment (with timestamp) per buffer.
+
+SIGMF_VERSION = "1.0.0"
+RX_PROPERTIES = ("rx_lo", "tx_lo", "rx_rf_bandwidth", "rx_hardwaregain_chan0", "gain_control_mode_chan0")
+
+def _paths(base_path):
+    for suffix in (".sigmf-meta", ".sigmf-data"):
+        if base_path.endswith(suffix):
+            base_path = base_path[:-len(suffix)]
+    return base_path + ".sigmf-data", base_path + ".sigmf-meta"
+
+
+class IQRecorder:
+    def __init__(self, base_path, sample_rate, rx_lo=None, description="", **properties):
+        self.data_path, self.meta_path = _paths(base_path)
+        self.metadata = {
+            "global": {
+                "core:datatype": "cf32_le",
+                "core:sample_rate": float(sample_rate),
+                "core:version": SIGMF_VERSION,
+                "core:hw": "ADALM-PLUTO",
+                "core:description": description,
+                **{f"pluto:{name}": value for name, value in properties.items()},
+            },
+            "captures": [],
+            "annotations": [],
+        }
+        if rx_lo is not None:
+            self.metadata["global"]["pluto:rx_lo"] = rx_lo
+        self.rx_lo = rx_lo
+        self.num_samples = 0
+        self._file = open(self.data_path, "wb")
+
+    @classmethod
+    def from_sdr(cls, sdr, base_path, description=""):
+        properties = {name: getattr(sdr, name) for name in RX_PROPERTIES if hasattr(sdr, name)}
+        properties.pop("rx_lo", None)
+        return cls(base_path, sdr.sample_rate, rx_lo=getattr(sdr, "rx_lo", None), description=description, **properties)
+
+    def write(self, buffer):
+        capture = {
+            "core:sample_start": self.num_samples,
+            "core:datetime": datetime.now(timezone.utc).isoformat(),
+        }
+        if self.rx_lo is not None:
+            capture["core:frequency"] = float(self.rx_lo)
+        self.metadata["captures"].append(capture)
+
+        samples = np.asarray(buffer, dtype=np.complex64)
+        samples.astype("<c8", copy=False).tofile(self._file)
+        self.num_samples += len(samples)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        with open(self.meta_path, "w") as f:
+            json.dump(self.metadata, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def record(sdr, base_path, num_buffers, description=""):
+    # Stream num_buffers sdr.rx() buffers straight to disk
+    with IQRecorder.from_sdr(sdr, base_path, description=description) as recorder:
+        for _ in range(num_buffers):
+            recorder.write(sdr.rx())
+    return recorder.num_samples
+
+
+class ReplayPluto:
+    # Drop-in for adi.Pluto that serves a recording. rx() returns read-only
+    # views into a np.memmap of the data file, so no samples are copied;
+    # only a buffer that wraps around the end of a looped recording is
+    # assembled into a new array. tx() is accepted and ignored.
+    def __init__(self, base_path, loop=False):
+        self.data_path, self.meta_path = _paths(base_path)
+        with open(self.meta_path) as f:
+            self.metadata = json.load(f)
+        info = self.metadata["global"]
+        if info["core:datatype"] != "cf32_le":
+            raise ValueError(f"Unsupported datatype: {info['core:datatype']}")
+
+        self.uri = "replay:" + base_path
+        self.sample_rate = int(info["core:sample_rate"])
+        self.rx_lo = info.get("pluto:rx_lo")
+        self.tx_lo = info.get("pluto:tx_lo", self.rx_lo)
+        self.rx_rf_bandwidth = info.get("pluto:rx_rf_bandwidth")
+        self.rx_hardwaregain_chan0 = info.get("pluto:rx_hardwaregain_chan0")
+        self.gain_control_mode_chan0 = info.get("pluto:gain_control_mode_chan0")
+        self.tx_hardwaregain_chan0 = -10
+        self.tx_cyclic_buffer = True
+        self.rx_enabled_channels = [0]
+        self.tx_enabled_channels = [0]
+
+        captures = self.metadata.get("captures", [])
+        if len(captures) > 1:
+            self.rx_buffer_size = captures[1]["core:sample_start"] - captures[0]["core:sample_start"]
+        else:
+            self.rx_buffer_size = 1024
+
+        if os.path.getsize(self.data_path):
+            self.samples = np.memmap(self.data_path, dtype="<c8", mode="r")
+        else:
+            self.samples = np.zeros(0, dtype=np.complex64)
+        self.loop = loop
+        self.position = 0
+
+    def __len__(self):
+        return len(self.samples)
+
+    def rx(self):
+        n = int(self.rx_buffer_size)
+        start, stop = self.position, self.position + n
+        if stop <= len(self.samples):
+            self.position = stop
+            return self.samples[start:stop]
+        if not self.loop or len(self.samples) == 0:
+            if start >= len(self.samples):
+                raise EOFError("End of IQ recording")
+            self.position = len(self.samples)
+            return self.samples[start:]
+        self.position = stop % len(self.samples)
+        return np.take(self.samples, np.arange(start, stop), mode="wrap")
+
+    def rewind(self):
+        self.position = 0
+
+    def tx(self, data):
+        pass
+
+    def tx_destroy_buffer(self):
+        pass
+
+
+def replay_throughput(base_path, stages):
+    # Run the receive stages over a whole recording as fast as possible. Stages
+    # may work in place, so each read-only buffer is copied out first, as
+    # StreamingReceiver does into its ring.
+    sdr = ReplayPluto(base_path)
+    start = time.perf_counter()
+    while True:
+        try:
+            buffer = np.array(sdr.rx())
+        except EOFError:
+            break
+        for stage in stages:
+            buffer = stage(buffer)
+    elapsed = time.perf_counter() - start
+    return len(sdr) / elapsed, len(sdr) / sdr.sample_rate / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay PlutoSDR IQ captures")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record_parser = subparsers.add_parser("record", help="Record sdr.rx() buffers to <base>.sigmf-data/-meta")
+    record_parser.add_argument("base_path")
+    record_parser.add_argument("--uri", default="usb:1.5.5")
+    record_parser.add_argument("--buffers", type=int, default=100)
+    record_parser.add_argument("--buffer-size", type=int, default=2**16)
+    replay_parser = subparsers.add_parser("replay", help="Run AGC -> PLL -> LPF over a recording and report throughput")
+    replay_parser.add_argument("base_path")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        from pluto import create_pluto_instance
+        sdr = create_pluto_instance(args.uri)
+        sdr.rx_buffer_size = args.buffer_size
+        num_samples = record(sdr, args.base_path, args.buffers)
+        print(f"Recorded {num_samples} samples to {_paths(args.base_path)[0]}")
+    else:
+        from streaming import default_rx_stages
+        sample_rate = ReplayPluto(args.base_path).sample_rate
+        rate, realtime = replay_throughput(args.base_path, default_rx_stages(sample_rate))
+        print(f"Processed at {rate / 1e6:.2f} MS/s ({realtime:.2f}x real time)")
+
+if __name__ == "__main__":
+    main()
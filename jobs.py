@@ -0,0 +1,158 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from profiler import StageProfiler
+
+# Background jobs for the Streamlit app. A job function runs on a worker
+# thread as func(job, *args) and goes through job.run_stage() for every stage
+# of the chain; that is where progress is counted, the stage is profiled and
+# cancellation is checked. A long stage can report how far it got with
+# job.report(). Intermediate values handed to job.publish() can be
+# rendered while the job is still running. Jobs submitted with a key (e.g. a
+# deterministic simulation and its parameters) stay in the executor under it
+# once finished, so submitting the same work again returns the earlier job
+# instead of running it twice; jobs without a key always run.
+
+PENDING, RUNNING, DONE, FAILED, CANCELLED = "pending", "running", "done", "failed", "cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, key=None, stages=(), track_memory=True):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.stages = list(stages)
+        self.completed = []
+        self.stage = None
+        self.stage_progress = None  # (done, total) within the running stage
+        self.status = PENDING
+        self.partial = {}
+        self.result = None
+        self.error = None
+        self.profiler = StageProfiler(track_memory=track_memory)
+        self.submitted = time.time()
+        self.finished = None
+        self._cancel = threading.Event()
+
+    @property
+    def progress(self):
+        if not self.stages:
+            return 1.0 if self.done else 0.0
+        completed = len(self.completed)
+        stage_progress = self.stage_progress
+        if stage_progress is not None and stage_progress[1]:
+            completed += stage_progress[0] / stage_progress[1]
+        return min(completed / len(self.stages), 1.0)
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def sleep(self, seconds):
+        # Interruptible pause, for demo pacing
+        if self._cancel.wait(seconds):
+            self.check_cancelled()
+
+    def run_stage(self, name, func, *args, **kwargs):
+        self.check_cancelled()
+        self.stage = name
+        self.stage_progress = None
+        result = self.profiler.run(name, func, *args, **kwargs)
+        self.stage_progress = None
+        self.completed.append(name)
+        return result
+
+    def report(self, done, total):
+        self.stage_progress = (done, total)
+
+    def publish(self, **values):
+        self.partial.update(values)
+
+    def snapshot(self):
+        return dict(self.partial)
+
+
+class JobExecutor:
+    def __init__(self, max_workers=4, max_finished=32):
+        self.max_finished = max_finished
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()  # id -> job, least recently used first
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, stages=(), key=None, track_memory=True, **kwargs):
+        with self._lock:
+            job = self._jobs.get(self._by_key.get(key)) if key is not None else None
+            # Reuse a running or successful job with the same key; rerun failed or cancelled ones
+            if job is not None and job.status not in (FAILED, CANCELLED):
+                self._jobs.move_to_end(job.id)
+                return job
+            job = Job(key, stages, track_memory)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._by_key[key] = job.id
+            self._evict()
+        self._pool.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        try:
+            job.check_cancelled()
+            job.status = RUNNING
+            job.result = func(job, *args, **kwargs)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as error:
+            job.error = error
+            job.status = FAILED
+        finally:
+            job.stage = None
+            job.finished = time.time()
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            job = self._jobs.pop(job_id)
+            if self._by_key.get(job.key) == job_id:
+                del self._by_key[job.key]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def clear(self):
+        # Forget finished jobs, so the next submit of any key runs again
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job.done]:
+                job = self._jobs.pop(job_id)
+                if self._by_key.get(job.key) == job_id:
+                    del self._by_key[job.key]
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            for job in list(self._jobs.values()):
+                job.cancel()
+        self._pool.shutdown(wait=True)
@@ -1,20 +1,58 @@
 import numpy as np
 from math import sqrt
+from functools import lru_cache
+from scipy import signal
+from waveforms import carrier_matrix
 
-def qpsk_modulate(encoded_data, tb, fc=500e6, sampling_rate=500):
-    t = np.linspace(0, tb, sampling_rate)
-    c1 = sqrt(2/tb) * np.cos(2 * np.pi * fc * t)  # Cosine carrier (in-phase)
-    c2 = sqrt(2/tb) * np.sin(2 * np.pi * fc * t)  # Sine carrier (quadrature)
-    
-    num_bits = len(encoded_data)
-    qpsk = np.zeros((num_bits // 2, sampling_rate))
-    constellation_points = []
+def qpsk_modulate(encoded_data, tb, fc=500e6, sampling_rate=500, dtype=np.float64):
+    # Carriers c1 (cosine, in-phase) and c2 (sine, quadrature) come from the shared waveform cache
+    t, carriers = carrier_matrix(tb, fc, sampling_rate, dtype)
 
-    for i in range(0, num_bits, 2):
-        m_s1 = np.ones(sampling_rate) if encoded_data[i] == 1 else -np.ones(sampling_rate)
-        m_s2 = np.ones(sampling_rate) if encoded_data[i+1] == 1 else -np.ones(sampling_rate)
+    # Map every bit pair to (+/-1, +/-1) in one step
+    constellation_points = bits_to_levels(encoded_data)
 
-        qpsk[i // 2] = c1 * m_s1 + c2 * m_s2  # QPSK modulated signal
-        constellation_points.append([m_s1[0], m_s2[0]])
+    # Each row is m_s1 * c1 + m_s2 * c2, computed as one matrix product
+    qpsk = constellation_points.astype(dtype, copy=False) @ carriers  # QPSK modulated signal
 
     return qpsk, t, constellation_points
+
+def bits_to_levels(encoded_data):
+    bits = np.asarray(encoded_data)
+    num_symbols = len(bits) // 2
+    return np.where(bits[:2 * num_symbols].reshape(num_symbols, 2) == 1, 1.0, -1.0)
+
+@lru_cache(maxsize=16)
+def rrc_taps(samples_per_symbol, rolloff=0.35, span=8):
+    # Root-raised-cosine pulse spanning `span` symbols, normalized to unit energy
+    t = np.arange(-span * samples_per_symbol // 2, span * samples_per_symbol // 2 + 1) / samples_per_symbol
+    with np.errstate(divide='ignore', invalid='ignore'):
+        taps = ((np.sin(np.pi * t * (1 - rolloff)) + 4 * rolloff * t * np.cos(np.pi * t * (1 + rolloff)))
+                / (np.pi * t * (1 - (4 * rolloff * t) ** 2)))
+    taps[t == 0] = 1 + rolloff * (4 / np.pi - 1)
+    if rolloff > 0:
+        singular = np.isclose(np.abs(t), 1 / (4 * rolloff))
+        taps[singular] = (rolloff / sqrt(2)) * ((1 + 2 / np.pi) * np.sin(np.pi / (4 * rolloff))
+                                                 + (1 - 2 / np.pi) * np.cos(np.pi / (4 * rolloff)))
+    taps /= np.sqrt(np.sum(taps ** 2))
+    taps.flags.writeable = False
+    return taps
+
+def qpsk_modulate_baseband(encoded_data, samples_per_symbol=1, pulse='rect', rolloff=0.35, span=8):
+    # Complex baseband QPSK for sdr.tx: unit-energy symbols (I = first bit, Q = second bit).
+    # pulse='rect' holds each symbol for samples_per_symbol samples; pulse='rrc'
+    # shapes with a root-raised-cosine filter and keeps the filter tails, so the
+    # output has (num_symbols - 1) * samples_per_symbol + span * samples_per_symbol + 1 samples.
+    levels = bits_to_levels(encoded_data).astype(np.float32)
+    symbols = np.empty(len(levels), dtype=np.complex64)
+    symbols.real = levels[:, 0]
+    symbols.imag = levels[:, 1]
+    symbols /= np.float32(sqrt(2))
+
+    if pulse == 'rect':
+        if samples_per_symbol == 1:
+            return symbols
+        return np.repeat(symbols, samples_per_symbol)
+    if pulse == 'rrc':
+        taps = rrc_taps(samples_per_symbol, rolloff, span).astype(np.float32)
+        return signal.upfirdn(taps, symbols, up=samples_per_symbol).astype(np.complex64, copy=False)
+    raise ValueError(f"Unknown pulse shape: {pulse}")
@@ -1,8 +1,103 @@
-import matplotlib.pyplot as plt
+import functools
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+from matplotlib import rcParams
+from matplotlib.figure import Figure
 import numpy as np
 
+# Figures are created outside pyplot's figure manager so cached figures are not
+# kept alive (or counted) by pyplot, and every figure is drawn with one
+# vectorized artist per series. Long series are reduced with min/max
+# decimation to about two points per horizontal pixel, which keeps every peak
+# and trough visible while the point count no longer grows with the data.
+# Long series are decimated before the cached builder is called, so the cache
+# key hashes a few thousand points instead of the full capture.
+
+FIGURE_CACHE_SIZE = 32
+_figure_cache = OrderedDict()
+_figure_cache_lock = threading.Lock()  # the app draws from several job threads and sessions
+
+def _hash_value(h, value):
+    if isinstance(value, (list, tuple)) and not isinstance(value, str):
+        try:
+            value = np.asarray(value)
+        except ValueError:
+            for item in value:
+                _hash_value(h, item)
+            return
+        if value.dtype == object:
+            for item in value:
+                _hash_value(h, item)
+            return
+    if isinstance(value, np.ndarray):
+        h.update(repr((value.shape, value.dtype.str)).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    else:
+        h.update(repr(value).encode())
+    h.update(b'|')
+
+def cached_figure(func):
+    # LRU cache of built figures keyed by a hash of the input data, so re-runs
+    # of the app do not rebuild unchanged plots. Figures are stored pickled and
+    # every call gets its own copy, so threads never draw one Figure at once.
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        h = hashlib.blake2b(func.__name__.encode(), digest_size=16)
+        for value in args:
+            _hash_value(h, value)
+        for name in sorted(kwargs):
+            _hash_value(h, name)
+            _hash_value(h, kwargs[name])
+        key = h.hexdigest()
+
+        with _figure_cache_lock:
+            blob = _figure_cache.get(key)
+            if blob is not None:
+                _figure_cache.move_to_end(key)
+        if blob is not None:
+            return pickle.loads(blob)
+
+        # Built outside the lock; a concurrent miss on the same key builds it twice
+        fig = func(*args, **kwargs)
+        blob = pickle.dumps(fig)
+        with _figure_cache_lock:
+            _figure_cache[key] = blob
+            _figure_cache.move_to_end(key)
+            while len(_figure_cache) > FIGURE_CACHE_SIZE:
+                _figure_cache.popitem(last=False)
+        return fig
+    return wrapper
+
+def clear_figure_cache():
+    with _figure_cache_lock:
+        _figure_cache.clear()
+
+def _new_figure():
+    fig = Figure()
+    return fig, fig.subplots()
+
+def _pixel_width():
+    # Width of a default figure, which is what _new_figure() creates
+    return int(rcParams['figure.figsize'][0] * rcParams['figure.dpi'])
+
+def minmax_decimate(x, y, num_buckets):
+    # Keep the minimum and maximum of each of num_buckets equal slices, in time order
+    n = len(y)
+    if n <= 2 * num_buckets:
+        return x, y
+    bucket_size = n // num_buckets
+    buckets = y[:bucket_size * num_buckets].reshape(num_buckets, bucket_size)
+    lows, highs = buckets.argmin(axis=1), buckets.argmax(axis=1)
+    offsets = np.arange(num_buckets) * bucket_size
+    index = np.stack((np.minimum(lows, highs), np.maximum(lows, highs)), axis=1) + offsets[:, None]
+    index = np.append(index.reshape(-1), n - 1)
+    return x[index], y[index]
+
+@cached_figure
 def get_carrier_signals_figure(t, c1, c2):
-    fig, ax = plt.subplots()
+    fig, ax = _new_figure()
     ax.plot(t, c1, label='Cosine Carrier (In-phase)')
     ax.plot(t, c2, label='Sine Carrier (Quadrature)')
     ax.set_title('Carrier Signals')
@@ -13,18 +108,26 @@ def get_carrier_signals_figure(t, c1, c2):
     return fig
 
 def get_qpsk_signal_figure(qpsk_signal, t, tb, num_symbols):
-    fig, ax = plt.subplots()
-    for i in range(num_symbols):
-        ax.plot(t + i * tb, qpsk_signal[i])
+    # All symbols laid end to end as a single line
+    time = (t[None, :] + tb * np.arange(num_symbols)[:, None]).reshape(-1)
+    values = np.asarray(qpsk_signal)[:num_symbols].reshape(-1)
+    return _qpsk_signal_figure(*minmax_decimate(time, values, _pixel_width()))
+
+@cached_figure
+def _qpsk_signal_figure(time, values):
+    fig, ax = _new_figure()
+    ax.plot(time, values)
     ax.set_title('QPSK Modulated Signal')
     ax.set_xlabel('Time')
     ax.set_ylabel('Amplitude')
     ax.grid(True)
     return fig
 
+@cached_figure
 def get_constellation_figure(constellation_points):
-    fig, ax = plt.subplots()
-    constellation_points = np.array(constellation_points)
+    fig, ax = _new_figure()
+    # Only the distinct points need drawing; repeats land on the same marker
+    constellation_points = np.unique(np.asarray(constellation_points).reshape(-1, 2), axis=0)
     ax.scatter(constellation_points[:, 0], constellation_points[:, 1], color='blue')
     
     # Adding the plus sign to divide the diagram into 4 quadrants and changing its color to red
@@ -37,22 +140,46 @@ def get_constellation_figure(constellation_points):
     ax.grid(True)
     return fig
 
-def get_ber_vs_snr_figure(snr_values, ber_values):
-    fig, ax = plt.subplots()
+@cached_figure
+def get_ber_vs_snr_figure(snr_values, ber_values=None, ber_lower=None, ber_upper=None, **simulation_kwargs):
+    # Without measured BER values, run the Monte Carlo simulation for snr_values
+    if ber_values is None:
+        from ber_simulation import simulate_ber
+        results = simulate_ber(snr_values, **simulation_kwargs)
+        ber_values, ber_lower, ber_upper = results['ber'], results['ber_lower'], results['ber_upper']
+
+    fig, ax = _new_figure()
     ax.plot(snr_values, ber_values, marker='o')
+    if ber_lower is not None and ber_upper is not None:
+        ax.fill_between(snr_values, ber_lower, ber_upper, alpha=0.3, label='Confidence interval')
+        ax.legend()
     ax.set_title('BER vs. SNR')
     ax.set_xlabel('SNR (dB)')
     ax.set_ylabel('Bit Error Rate (BER)')
     ax.grid(True)
     return fig
 
+@cached_figure
 def get_impulse_plot(binary_data, parity_indices=None, title="Impulse Plot"):
-    fig, ax = plt.subplots()
-    if parity_indices is None:
-        parity_indices = []
-    for i in range(len(binary_data)):
-        color = 'r' if i in parity_indices else 'b'  # 'r' for red, 'b' for blue
-        ax.stem([i], [binary_data[i]], linefmt=color+'-', markerfmt=color+'o', basefmt=" ")
+    fig, ax = _new_figure()
+    binary_data = np.asarray(binary_data)
+    index = np.arange(len(binary_data))
+    is_parity = np.zeros(len(binary_data), dtype=bool)
+    if parity_indices is not None:
+        parity_indices = np.asarray(parity_indices, dtype=int)
+        is_parity[parity_indices[parity_indices < len(binary_data)]] = True
+
+    # One artist per color: 'b' for data bits, 'r' for parity bits
+    width = _pixel_width()
+    for color, mask in (('b', ~is_parity), ('r', is_parity)):
+        if not mask.any():
+            continue
+        if len(binary_data) <= 2 * width:
+            ax.stem(index[mask], binary_data[mask], linefmt=color+'-', markerfmt=color+'o', basefmt=" ")
+        else:
+            # More bits than pixels: draw one impulse per pixel column holding a set bit
+            columns = np.unique(index[mask & (binary_data != 0)] * width // len(binary_data))
+            ax.vlines(columns * len(binary_data) / width, 0, 1, colors=color)
     ax.set_title(title)
     ax.set_xlabel('Bit Index')
     ax.set_ylabel('Bit Value')
@@ -60,9 +187,16 @@ def get_impulse_plot(binary_data, parity_indices=None, title="Impulse Plot"):
     return fig
 
 def get_received_signal_figure(t, received_data_filtered):
-    fig, ax = plt.subplots()
     common_length = min(len(t), len(received_data_filtered))
-    ax.plot(t[:common_length], 20 * np.log10(np.abs(received_data_filtered[:common_length]) + 1e-12), label="Received Signal", linestyle='--')
+    # Decimate the magnitude before taking the log; min/max survive the monotonic map
+    time, magnitude = minmax_decimate(np.asarray(t[:common_length]),
+                                      np.abs(received_data_filtered[:common_length]), _pixel_width())
+    return _received_signal_figure(time, magnitude)
+
+@cached_figure
+def _received_signal_figure(time, magnitude):
+    fig, ax = _new_figure()
+    ax.plot(time, 20 * np.log10(magnitude + 1e-12), label="Received Signal", linestyle='--')
     ax.set_title('Received Signal from ADALM-Pluto')
     ax.set_xlabel('Time [s]')
     ax.set_ylabel('Amplitude [dB]')
@@ -70,6 +204,23 @@ def get_received_signal_figure(t, received_data_filtered):
     ax.legend()
     return fig
 
+@cached_figure
+def get_spectrum_figure(freqs, psd_db, waterfall=None):
+    # Averaged PSD, with the waterfall (one row per buffer, oldest at the top) below it
+    fig = Figure(figsize=(6.4, 7.2) if waterfall is not None else None)
+    axes = fig.subplots(2, 1, sharex=True) if waterfall is not None else [fig.subplots()]
+    freqs = np.asarray(freqs) / 1e3
+    axes[0].plot(freqs, psd_db)
+    axes[0].set_title('Received Spectrum (Welch PSD)')
+    axes[0].set_ylabel('PSD [dB/Hz]')
+    axes[0].grid(True)
+    if waterfall is not None:
+        axes[1].imshow(waterfall, aspect='auto', interpolation='nearest',
+                       extent=(freqs[0], freqs[-1], len(waterfall), 0))
+        axes[1].set_ylabel('Buffer')
+    axes[-1].set_xlabel('Frequency offset [kHz]')
+    return fig
+
 
 def get_encoded_data_plot(encoded_data, parity_indices=None, title="Encoded Data with Parity Bits"):
     return get_impulse_plot(encoded_data, parity_indices=parity_indices, title=title)
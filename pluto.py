@@ -5,58 +5,35 @@ import numpy as np
 import pandas as pd
 from scipy import signal
 from scipy.signal.windows import hamming
-from scipy.signal import lfilter, welch
+from scipy.signal import lfilter
 import matplotlib.pyplot as plt
-import adi
-
-def pll(input_signal, fs, loop_bandwidth=0.01):
-    phase_estimate = 0.0
-    output_signal = np.zeros_like(input_signal, dtype=complex)
-    freq_estimate = 0.0
-    Kp = 2 * np.pi * loop_bandwidth
-    Ki = (Kp ** 2) / 4
-    integrator = 0.0
-    
-    for i in range(len(input_signal)):
-        phase_error = np.angle(input_signal[i] * np.exp(-1j * phase_estimate))
-        integrator += Ki * phase_error
-        freq_estimate = integrator + Kp * phase_error
-        phase_estimate += freq_estimate / fs
-        output_signal[i] = input_signal[i] * np.exp(-1j * phase_estimate)
-    
-    return output_signal, freq_estimate
-
-def low_pass_filter(data, cutoff_freq, fs, order=5):
-    nyquist = 0.5 * fs
-    normal_cutoff = cutoff_freq / nyquist
-    b, a = signal.butter(order, normal_cutoff, btype='low', analog=False)
-    return lfilter(b, a, data)
-
-def apply_agc(signal, target_level=0.1):
-    max_val = np.max(np.abs(signal))
-    gain = target_level / max_val
-    return signal * gain
+from dsp import pll, low_pass_filter, apply_agc, complex_dtype
+from streaming import StreamingReceiver
+from synchronization import build_frame
+from device_pool import PLUTO_CONFIG, open_pluto
+from waveforms import hamming_tone
 
 def create_pluto_instance(uri="usb:1.5.5"):
-    sdr = adi.Pluto(uri=uri)
-    sdr.rx_rf_bandwidth = 4000000
-    sdr.sample_rate = 6000000
-    sdr.rx_lo = 500000000  # 500 MHz Local Oscillator
-    sdr.tx_lo = 500000000  # 500 MHz Local Oscillator
-    sdr.tx_cyclic_buffer = True
-    sdr.tx_hardwaregain_chan0 = -10
-    sdr.gain_control_mode_chan0 = "manual"
-    sdr.rx_hardwaregain_chan0 = 50
-
-    sdr.rx_enabled_channels = [0]
-    sdr.tx_enabled_channels = [0]
+    # "replay:<path>" serves a recording made with iq_recording.record instead of a radio
+    sdr = open_pluto(uri)
+    if uri.startswith("replay:"):
+        return sdr
+
+    for name, value in PLUTO_CONFIG.items():
+        setattr(sdr, name, value)
     return sdr
 
-def transmit_and_receive(sdr, N, fc, fs):
-    ts = 1 / float(fs)
-    t = np.arange(0, N * ts, ts)  # 1 second worth of time steps
-    sine_wave = np.cos(2 * np.pi * fc * t) * 2**14 * hamming(N)
-    iq = sine_wave + 1j * sine_wave
+def receive(sdr, precision=None):
+    # One sdr.rx() buffer, cast to the precision mode's dtype ("single" or
+    # "double"); None returns it as delivered
+    received_data = sdr.rx()
+    if precision is None:
+        return received_data
+    return np.asarray(received_data, dtype=complex_dtype(precision))
+
+def transmit_and_receive(sdr, N, fc, fs, precision=None):
+    # Hamming-windowed cosine on I and Q, built once per (N, fc, fs) and shared read-only
+    iq = hamming_tone(N, fc, fs, dtype=complex_dtype(precision or "double"))
 
     print(f"Transmitting {fc / 1e6} MHz Sine waveform for 1 second...")
     sdr.tx(iq)
@@ -65,9 +42,45 @@ def transmit_and_receive(sdr, N, fc, fs):
     time.sleep(1)
 
     # Receive data
-    received_data = sdr.rx()
+    received_data = receive(sdr, precision)
 
     # Stop transmission
     sdr.tx_destroy_buffer()
 
     return received_data, iq[:len(received_data)]
+
+def transmit_frame_and_receive(sdr, encoded_data, samples_per_symbol=8, precision=None):
+    # Pulse-shaped QPSK frame (preamble + payload) followed by an equally long
+    # gap, so the cyclic repeats are separated and one RX buffer of twice the
+    # TX length always holds a complete frame
+    frame = build_frame(encoded_data, samples_per_symbol)
+    iq = np.concatenate((frame, np.zeros_like(frame)))
+    iq *= 2**14 * 0.5 / np.max(np.abs(iq))
+
+    print(f"Transmitting {len(frame)}-sample QPSK frame...")
+    sdr.rx_buffer_size = 2 * len(iq)
+    sdr.tx(iq)
+
+    # Discard one buffer while the transmitter settles, then receive
+    sdr.rx()
+    received_data = receive(sdr, precision)
+
+    # Stop transmission
+    sdr.tx_destroy_buffer()
+
+    return received_data, iq
+
+def transmit_and_stream(sdr, iq, num_buffers, sink=None, buffer_size=2**16, num_slots=8, block_on_full=False,
+                        precision="single", max_results=64):
+    sdr.rx_buffer_size = buffer_size
+    sdr.tx(iq)
+
+    # Receive continuously while DSP runs on earlier buffers
+    receiver = StreamingReceiver(sdr, sink=sink, num_slots=num_slots, block_on_full=block_on_full,
+                                 precision=precision, max_results=max_results)
+    try:
+        results = receiver.run(num_buffers)
+    finally:
+        sdr.tx_destroy_buffer()
+
+    return results, receiver.stats
@@ -1,61 +1,20 @@
 import os
+import sys
 import time
 import numpy as np
 import pandas as pd
-from scipy import signal
-from scipy.signal.windows import hamming
-from scipy.signal import lfilter, welch
 import matplotlib.pyplot as plt
-import adi
-
-# Custom PLL function for frequency correction
-def pll(input_signal, fs, loop_bandwidth=0.01):
-    phase_estimate = 0.0
-    output_signal = np.zeros_like(input_signal, dtype=complex)
-    freq_estimate = 0.0
-    Kp = 2 * np.pi * loop_bandwidth
-    Ki = (Kp ** 2) / 4
-    prev_phase_error = 0.0
-    integrator = 0.0
-    
-    for i in range(len(input_signal)):
-        phase_error = np.angle(input_signal[i] * np.exp(-1j * phase_estimate))
-        integrator += Ki * phase_error
-        freq_estimate = integrator + Kp * phase_error
-        phase_estimate += freq_estimate / fs
-        output_signal[i] = input_signal[i] * np.exp(-1j * phase_estimate)
-    
-    return output_signal, freq_estimate
-
-# Low-pass filter design
-def low_pass_filter(data, cutoff_freq, fs, order=5):
-    nyquist = 0.5 * fs
-    normal_cutoff = cutoff_freq / nyquist
-    b, a = signal.butter(order, normal_cutoff, btype='low', analog=False)
-    return lfilter(b, a, data)
-
-# Automatic Gain Control (AGC)
-def apply_agc(signal, target_level=0.1):
-    max_val = np.max(np.abs(signal))
-    gain = target_level / max_val
-    return signal * gain
-
-# Create radio instance
-sdr = adi.Pluto(uri="usb:1.34.5")  # Updated URI
-
-# Configure SDR properties
-sdr.rx_rf_bandwidth = 4000000
-sdr.sample_rate = 6000000
-sdr.rx_lo = 500000000  # 500 MHz Local Oscillator
-sdr.tx_lo = 500000000  # 500 MHz Local Oscillator
-sdr.tx_cyclic_buffer = True
-sdr.tx_hardwaregain_chan0 = -10
-sdr.gain_control_mode_chan0 = "manual"
-sdr.rx_hardwaregain_chan0 = 50
-
-# Enable channels
-sdr.rx_enabled_channels = [0]
-sdr.tx_enabled_channels = [0]
+from dsp import pll, low_pass_filter, apply_agc, complex_dtype
+from pluto import create_pluto_instance
+from spectrum import SpectrumMonitor
+from waveforms import hamming_tone
+
+# Create radio instance; pass "replay:<path>" to run from a recording
+sdr = create_pluto_instance(sys.argv[1] if len(sys.argv) > 1 else "usb:1.34.5")  # Updated URI
+
+# "single" keeps the received IQ in complex64 through AGC, PLL and filtering
+precision = sys.argv[2] if len(sys.argv) > 2 else "double"
+dtype = complex_dtype(precision)
 
 # Define waveform parameters
 fs = int(sdr.sample_rate)
@@ -64,9 +23,8 @@ fc = 5e8  # 500 MHz
 ts = 1 / float(fs)
 t = np.arange(0, N * ts, ts)  # 1 second worth of time steps
 
-# Generate a sine wave with a Hamming window
-sine_wave = np.cos(2 * np.pi * fc * t) * 2**14 * hamming(N)
-iq = sine_wave + 1j * sine_wave
+# Generate a sine wave with a Hamming window (cached, shared with pluto.transmit_and_receive)
+iq = hamming_tone(N, fc, fs, dtype=dtype)
 
 # Transmit the sine wave
 print(f"Transmitting 500 MHz Sine waveform for 1 second...")
@@ -84,14 +42,23 @@ sdr.tx_destroy_buffer()
 # Ensure transmitted and received signals have the same length for comparison
 transmitted_data = iq[:len(received_data)]
 
-# Apply Automatic Gain Control
-received_data = apply_agc(received_data)
+# Apply Automatic Gain Control into a working buffer of the chosen precision;
+# the stages below reuse it in place
+received_data = apply_agc(received_data, out=np.empty(len(received_data), dtype=dtype))
+
+# Spectrum of the received buffer: occupancy, LO offset and SNR at a glance
+monitor = SpectrumMonitor(fs)
+monitor.process(received_data)
+link = monitor.measurements
+print(f"Carrier offset: {link['carrier_offset'] / 1e3:.1f} kHz, "
+      f"occupied bandwidth: {link['occupied_bandwidth'] / 1e3:.1f} kHz, SNR: {link['snr_db']:.1f} dB")
 
 # Apply PLL for frequency offset correction
-received_data_corrected, freq_estimate = pll(received_data, fs)
+received_data_corrected, freq_estimate = pll(received_data, fs, out=received_data)
 
 # Apply low-pass filtering to reduce noise further
-received_data_filtered = low_pass_filter(received_data_corrected, cutoff_freq=0.1 * (fs/2), fs=fs)
+received_data_filtered = low_pass_filter(received_data_corrected, cutoff_freq=0.1 * (fs/2), fs=fs,
+                                         out=received_data_corrected)
 
 # Plot: Received Signal in Time-Domain (Full 1 Second)
 plt.figure(figsize=(12, 6))
@@ -101,6 +68,14 @@ plt.xlabel("Time [s]")
 plt.ylabel("Amplitude [dB]")
 plt.legend()
 plt.grid()
+
+# Plot: Welch PSD of the received buffer
+plt.figure(figsize=(12, 6))
+plt.plot(monitor.freqs / 1e3, monitor.psd_db())
+plt.title("Received Spectrum (Welch PSD)")
+plt.xlabel("Frequency offset [kHz]")
+plt.ylabel("PSD [dB/Hz]")
+plt.grid()
 plt.show()
 
 # Cleanup
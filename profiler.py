@@ -0,0 +1,101 @@
+import functools
+import json
+import threading
+import time
+import tracemalloc
+import numpy as np
+
+# tracemalloc is process-wide: profilers running on several threads share one
+# tracing session, started by the first and stopped by the last of them
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_owns_tracing = False
+
+def _acquire_tracing():
+    global _tracing_users, _owns_tracing
+    with _tracing_lock:
+        if _tracing_users == 0:
+            _owns_tracing = not tracemalloc.is_tracing()
+            if _owns_tracing:
+                tracemalloc.start()
+        _tracing_users += 1
+
+def _release_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _owns_tracing:
+            tracemalloc.stop()
+
+
+def _count_samples(value):
+    if isinstance(value, np.ndarray):
+        return int(value.size)
+    if isinstance(value, (list, str, bytes)):
+        return len(value)
+    return None
+
+
+class StageProfiler:
+    # Records wall time, throughput and allocations for each stage of the chain.
+    # Samples are counted from the first array-like argument, or from the
+    # (first element of the) result for stages such as transmit_and_receive
+    # whose inputs are not sample buffers. Allocated bytes are the tracemalloc
+    # peak above the level at stage entry; NumPy reports its buffers to
+    # tracemalloc, so this covers array temporaries. Stages profiled at the same
+    # time on other threads share tracemalloc's peak, so their figures overlap.
+    def __init__(self, track_memory=True, on_record=None):
+        self.track_memory = track_memory
+        self.on_record = on_record
+        self.records = []
+
+    def run(self, name, func, *args, **kwargs):
+        if self.track_memory:
+            _acquire_tracing()
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            wall_time = time.perf_counter() - start
+            peak_bytes = None
+            if self.track_memory:
+                peak_bytes = max(tracemalloc.get_traced_memory()[1] - baseline, 0)
+                _release_tracing()
+
+        samples = next((n for n in map(_count_samples, args) if n is not None), None)
+        if samples is None:
+            samples = _count_samples(result[0] if isinstance(result, tuple) else result)
+
+        record = {
+            "stage": name,
+            "wall_time_s": wall_time,
+            "samples": samples,
+            "samples_per_s": samples / wall_time if samples is not None and wall_time > 0 else None,
+            "peak_bytes": peak_bytes,
+        }
+        self.records.append(record)
+        if self.on_record is not None:
+            self.on_record(record)
+        return result
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.run(name, func, *args, **kwargs)
+        return wrapper
+
+    def report(self):
+        return {
+            "stages": list(self.records),
+            "total_wall_time_s": sum(record["wall_time_s"] for record in self.records),
+        }
+
+    def to_json(self, path=None):
+        text = json.dumps(self.report(), indent=2)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
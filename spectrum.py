@@ -0,0 +1,141 @@
+from functools import lru_cache
+import numpy as np
+from scipy import fft, signal
+from numpy.lib.stride_tricks import sliding_window_view
+
+SEGMENT_CHUNK = 32  # segments windowed and transformed per FFT call
+
+# Live spectrum analysis of RX buffers. Each buffer is cut into overlapping
+# segments (a strided view) that are windowed and transformed SEGMENT_CHUNK at
+# a time, so temporaries stay a few hundred kB whatever the buffer size. Their
+# periodograms are averaged into a Welch PSD with the same density scaling as
+# scipy.signal.welch. The per-buffer PSD feeds a running average and one row
+# of a waterfall ring, and is reduced to a few link measurements:
+#   noise floor       median PSD bin (the signal should fill < half the span)
+#   occupied bw       span holding `occupied_fraction` of the power above the
+#                     floor, counting only bins that clear the floor by more
+#                     than the spread of an average of num_segments periodograms
+#   carrier offset    power-weighted centre of that excess power
+#   snr_db            excess power over the noise in the occupied bandwidth
+# scipy.fft keeps its own cache of FFT plans, so repeated transforms of one
+# size only pay for the plan once; windows are cached here.
+
+@lru_cache(maxsize=16)
+def spectrum_window(nfft, window="hann"):
+    taps = signal.get_window(window, nfft).astype(np.float64)
+    taps.flags.writeable = False
+    return taps
+
+@lru_cache(maxsize=16)
+def spectrum_freqs(nfft, fs, two_sided=True):
+    # Bin frequencies of buffer_psd: fftshifted for IQ, rfft bins for real input
+    if two_sided:
+        freqs = fft.fftshift(fft.fftfreq(nfft, 1 / fs))
+    else:
+        freqs = fft.rfftfreq(nfft, 1 / fs)
+    freqs.flags.writeable = False
+    return freqs
+
+
+class SpectrumMonitor:
+    # Pass-through stage: process() returns its input unchanged, so it can be
+    # placed among StreamingReceiver stages. The PSD average is linear over the
+    # first num_average buffers and exponential (weight 1 / num_average) after.
+    def __init__(self, fs, nfft=1024, overlap=0.5, window="hann", num_average=16,
+                 waterfall_rows=128, occupied_fraction=0.99):
+        self.fs = float(fs)
+        self.nfft = int(nfft)
+        self.step = max(int(self.nfft * (1 - overlap)), 1)
+        self.window = spectrum_window(self.nfft, window)
+        self.scale = 1 / (self.fs * np.sum(self.window ** 2))
+        self.num_average = num_average
+        self.occupied_fraction = occupied_fraction
+        self.waterfall_rows = waterfall_rows
+        self._complex = None
+        self.num_segments = 1
+        self.reset()
+
+    def reset(self):
+        self.psd = None
+        self.num_buffers = 0
+        self.measurements = {}
+        self._waterfall = None
+        self._row = 0
+
+    @property
+    def freqs(self):
+        return spectrum_freqs(self.nfft, self.fs, self._complex is not False)
+
+    def buffer_psd(self, x):
+        x = np.asarray(x)
+        if len(x) < self.nfft:
+            x = np.concatenate((x, np.zeros(self.nfft - len(x), dtype=x.dtype)))
+        segments = sliding_window_view(x, self.nfft)[::self.step]
+        self.num_segments = len(segments)
+        self._complex = np.iscomplexobj(x)
+        transform = fft.fft if self._complex else fft.rfft
+        psd = None
+        for start in range(0, len(segments), SEGMENT_CHUNK):
+            spectra = transform(segments[start:start + SEGMENT_CHUNK] * self.window, axis=1)
+            power = spectra.real ** 2
+            power += spectra.imag ** 2
+            if psd is None:
+                psd = power.sum(axis=0)
+            else:
+                psd += power.sum(axis=0)
+        psd *= self.scale / len(segments)
+        if self._complex:
+            return fft.fftshift(psd)
+        # One-sided: fold the negative frequencies onto the positive ones
+        psd[1:-1 if self.nfft % 2 == 0 else None] *= 2
+        return psd
+
+    def process(self, x):
+        psd = self.buffer_psd(x)
+        self.num_buffers += 1
+        if self.psd is None:
+            self.psd = psd.copy()
+        else:
+            self.psd += (psd - self.psd) / min(self.num_buffers, self.num_average)
+
+        if self._waterfall is None:
+            self._waterfall = np.full((self.waterfall_rows, len(psd)), np.nan, dtype=np.float32)
+        self._waterfall[self._row] = 10 * np.log10(psd + 1e-30)
+        self._row = (self._row + 1) % self.waterfall_rows
+
+        self.measurements = estimate_link(self.freqs, psd, self.occupied_fraction, self.num_segments)
+        return x
+
+    def waterfall(self):
+        # Rows in dB, oldest first; rows not yet filled are NaN
+        if self._waterfall is None:
+            return None
+        return np.roll(self._waterfall, -self._row, axis=0)
+
+    def psd_db(self):
+        return None if self.psd is None else 10 * np.log10(self.psd + 1e-30)
+
+
+def estimate_link(freqs, psd, occupied_fraction=0.99, num_segments=1):
+    df = freqs[1] - freqs[0]
+    noise_floor = float(np.median(psd))
+    excess = psd - noise_floor
+    excess[psd < noise_floor * (1 + 4 / np.sqrt(num_segments))] = 0
+    total = excess.sum()
+    if total <= 0:
+        return {"noise_floor": noise_floor, "signal_power": 0.0, "snr_db": -np.inf,
+                "carrier_offset": 0.0, "occupied_bandwidth": 0.0}
+
+    cumulative = np.cumsum(excess) / total
+    tail = (1 - occupied_fraction) / 2
+    low = int(np.searchsorted(cumulative, tail))
+    high = int(np.searchsorted(cumulative, 1 - tail))
+    occupied_bandwidth = (high - low + 1) * df
+    signal_power = total * df
+    return {
+        "noise_floor": noise_floor,
+        "signal_power": float(signal_power),
+        "snr_db": float(10 * np.log10(signal_power / (noise_floor * occupied_bandwidth))),
+        "carrier_offset": float(np.dot(freqs, excess) / total),
+        "occupied_bandwidth": float(occupied_bandwidth),
+    }
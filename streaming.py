@@ -0,0 +1,161 @@
+import queue
+import threading
+from collections import deque
+import numpy as np
+from dsp import AutomaticGainControl, CarrierRecovery, LowPassFilter, complex_dtype
+
+
+def default_rx_stages(fs, cutoff_freq=None, monitor=None):
+    # monitor: optional spectrum.SpectrumMonitor, run on the raw buffers first.
+    # Each stage writes its output back into the ring slot it was given, and
+    # AGC, PLL and filter all carry their state from one buffer to the next.
+    if cutoff_freq is None:
+        cutoff_freq = 0.1 * (fs / 2)
+    agc = AutomaticGainControl()
+    recovery = CarrierRecovery(fs)
+    lpf = LowPassFilter(cutoff_freq, fs)
+    stages = [
+        lambda buffer: agc.process(buffer, out=buffer),
+        lambda buffer: recovery.process(buffer, out=buffer),
+        lambda buffer: lpf.process(buffer, out=buffer),
+    ]
+    return [monitor.process] + stages if monitor is not None else stages
+
+
+class StreamingReceiver:
+    # Continuous receive pipeline. A producer thread copies sdr.rx() buffers
+    # into a ring of preallocated slots (complex64 with precision="single",
+    # complex128 with "double"; the default stages keep that precision and
+    # work in place), and one worker thread per stage (AGC -> PLL -> LPF by
+    # default) processes slots in order, so DSP on buffer k overlaps with
+    # capture of buffer k+1. The optional sink (e.g. a
+    # demodulator) runs last on each buffer and its return values are
+    # collected in `results`; without a sink, copies of the processed buffers
+    # are collected instead. Only the latest max_results entries are kept
+    # (None keeps everything), so a long run without a sink stays bounded.
+    #
+    # The ring bounds memory. When every slot is in use the producer either
+    # waits for one to free up (block_on_full=True, counted as a stall) or
+    # keeps draining the radio and discards the buffer (counted as dropped).
+    def __init__(self, sdr, stages=None, sink=None, num_slots=8, block_on_full=False, precision="single",
+                 max_results=64):
+        self.sdr = sdr
+        self.buffer_size = int(sdr.rx_buffer_size)
+        self.stages = list(stages) if stages is not None else default_rx_stages(float(sdr.sample_rate))
+        self.sink = sink
+        self.block_on_full = block_on_full
+
+        self.ring = np.zeros((num_slots, self.buffer_size), dtype=complex_dtype(precision))
+        self._free = queue.Queue()
+        for slot in range(num_slots):
+            self._free.put(slot)
+        self._queues = [queue.Queue() for _ in range(len(self.stages) + 1)]
+
+        self.results = deque(maxlen=max_results)
+        self.stats = {"received": 0, "processed": 0, "dropped": 0, "stalls": 0, "max_in_flight": 0}
+        self.error = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self, num_buffers=None):
+        self._threads = [threading.Thread(target=self._produce, args=(num_buffers,), daemon=True)]
+        for index in range(len(self.stages)):
+            self._threads.append(threading.Thread(target=self._run_stage, args=(index,), daemon=True))
+        self._threads.append(threading.Thread(target=self._consume, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+        return list(self.results)
+
+    def run(self, num_buffers):
+        self.start(num_buffers)
+        return self.join()
+
+    def _acquire_slot(self):
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        if not self.block_on_full:
+            self.stats["dropped"] += 1
+            return None
+        self.stats["stalls"] += 1
+        while not self._stop.is_set():
+            try:
+                return self._free.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _produce(self, num_buffers):
+        seq = 0
+        try:
+            while not self._stop.is_set() and (num_buffers is None or seq < num_buffers):
+                data = self.sdr.rx()
+                self.stats["received"] += 1
+                slot = self._acquire_slot()
+                if slot is not None:
+                    n = min(len(data), self.buffer_size)
+                    self.ring[slot, :n] = data[:n]
+                    self._queues[0].put((seq, slot, n))
+                    in_flight = self.ring.shape[0] - self._free.qsize()
+                    self.stats["max_in_flight"] = max(self.stats["max_in_flight"], in_flight)
+                seq += 1
+        except Exception as exc:
+            self._fail(exc)
+        finally:
+            self._queues[0].put(None)
+
+    def _run_stage(self, index):
+        stage = self.stages[index]
+        inbox, outbox = self._queues[index], self._queues[index + 1]
+        while True:
+            item = inbox.get()
+            if item is None:
+                outbox.put(None)
+                return
+            if self.error is not None:
+                self._free.put(item[1])
+                continue
+            seq, slot, n = item
+            try:
+                buffer = self.ring[slot, :n]
+                output = stage(buffer)
+                if output is not buffer:
+                    buffer[:] = output
+            except Exception as exc:
+                self._fail(exc)
+                self._free.put(slot)
+                continue
+            outbox.put(item)
+
+    def _consume(self):
+        inbox = self._queues[-1]
+        while True:
+            item = inbox.get()
+            if item is None:
+                return
+            seq, slot, n = item
+            try:
+                if self.error is None:
+                    buffer = self.ring[slot, :n]
+                    result = self.sink(buffer) if self.sink is not None else buffer.copy()
+                    self.results.append((seq, result))
+                    self.stats["processed"] += 1
+            except Exception as exc:
+                self._fail(exc)
+            finally:
+                self._free.put(slot)
+
+    def _fail(self, exc):
+        if self.error is None:
+            self.error = exc
+        self._stop.set()
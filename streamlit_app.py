@@ -1,188 +1,311 @@
 import streamlit as st
 import numpy as np
 import time
-from math import sqrt
 from encoder_decoder import hamming_encode, hamming_decode
 from modulation import qpsk_modulate
-from demodulation import qpsk_demodulate
+from demodulation import qpsk_demodulate_baseband
+from synchronization import synchronize_frame
 from utils import string_to_binary, binary_to_string
+from ber_simulation import simulate_ber
 from plots import (
-    get_carrier_signals_figure, get_qpsk_signal_figure, 
+    get_carrier_signals_figure, get_qpsk_signal_figure,
     get_constellation_figure, get_ber_vs_snr_figure,
     get_impulse_plot, get_encoded_data_plot,
-    get_received_signal_figure  # Import the new function
+    get_received_signal_figure,  # Import the new function
+    get_spectrum_figure
 )
-from pluto import create_pluto_instance, transmit_and_receive, pll, apply_agc, low_pass_filter
+from pluto import transmit_frame_and_receive, apply_agc
+from device_pool import DevicePool
+from spectrum import SpectrumMonitor
+from waveforms import carriers
+from jobs import JobExecutor, DONE, FAILED, CANCELLED
+
+bit_rate = 500e6  # 500 Mbps
+tb = 1 / bit_rate  # Symbol duration
+fc = 500e6  # Carrier frequency
+sampling_rate = 500  # Sampling rate
+snr_values = np.arange(0, 21, 2)
+POLL_INTERVAL = 0.25  # Seconds between progress updates while jobs run
+
+CHAIN_STAGES = [
+    'string_to_binary', 'hamming_encode', 'qpsk_modulate', 'transmit_and_receive', 'apply_agc',
+    'spectrum', 'synchronize_frame', 'qpsk_demodulate', 'hamming_decode', 'binary_to_string',
+]
+
+@st.cache_resource
+def get_device_pool():
+    # One pool per server process: device sessions stay open and configured across runs
+    return DevicePool()
+
+@st.cache_resource
+def get_job_executor():
+    # Shared by every session of this server process: runs go to worker threads,
+    # and the seeded BER sweep stays cached under its parameters
+    return JobExecutor(max_workers=4)
+
+def run_chain(job, phrase, device_uri, demo_pacing, pool):
+    # Runs on a worker thread, so no Streamlit calls here; results go out through job.publish
+    def pace():
+        if demo_pacing:
+            job.sleep(2)
+
+    # Converting text to binary
+    binary_data = job.run_stage('string_to_binary', string_to_binary, phrase)
+    job.publish(binary_data=binary_data)
+    pace()
+
+    # Adding parity bits
+    encoded_data = job.run_stage('hamming_encode', hamming_encode, np.array(binary_data))
+    job.publish(encoded_data=encoded_data, parity_indices=[i for i in range(len(encoded_data)) if i % 7 >= 4])
+    pace()
+
+    # Performing QPSK modulation
+    qpsk_signal, t, constellation_points = job.run_stage('qpsk_modulate', qpsk_modulate, encoded_data, tb, fc, sampling_rate)
+    job.publish(qpsk_signal=qpsk_signal, t=t, constellation_points=constellation_points)
+    pace()
+
+    # Perform Transmission and Reception using ADALM-PLUTO, one run at a time per device
+    session = pool.session(device_uri or None)
+    with session.lock:
+        # The pulse-shaped baseband form of the same encoded bits goes over the air
+        received_data, transmitted_data = job.run_stage('transmit_and_receive', transmit_frame_and_receive,
+                                                        session.sdr, encoded_data)
+    sample_rate = session.sdr.sample_rate
+
+    # Apply signal processing
+    received_data = job.run_stage('apply_agc', apply_agc, received_data)
+    job.publish(received_data=received_data, sample_rate=sample_rate)
+
+    # PSD, carrier offset, occupied bandwidth and SNR of the capture
+    monitor = SpectrumMonitor(sample_rate)
+    job.run_stage('spectrum', monitor.process, received_data)
+    job.publish(spectrum=(monitor.freqs, monitor.psd_db(), monitor.measurements))
+
+    # Frame detection, matched filtering, timing and carrier recovery; the
+    # matched filter and preamble-aided carrier estimate take the place of
+    # the PLL and low-pass filter on this path
+    synchronized = job.run_stage('synchronize_frame', synchronize_frame, received_data, len(encoded_data))
+    if synchronized is None:
+        raise RuntimeError("No frame was detected in the received signal.")
+    received_symbols, sync_info = synchronized
+
+    # Demodulating the received symbols
+    demod_binary = job.run_stage('qpsk_demodulate', qpsk_demodulate_baseband, received_symbols)[:len(encoded_data)]
+    job.publish(demod_binary=demod_binary)
+    pace()
+
+    # Decoding and removing parity bits
+    decoded_data = job.run_stage('hamming_decode', hamming_decode, np.array(demod_binary))
+    job.publish(decoded_data=decoded_data)
+    pace()
+
+    # Converting binary back to text
+    received_phrase = job.run_stage('binary_to_string', binary_to_string, decoded_data[:len(binary_data)])
+
+    # Calculate the error details
+    errors = np.sum(np.array(binary_data) != decoded_data[:len(binary_data)])
+    summary = {
+        'phrase': phrase,
+        'received_phrase': received_phrase,
+        'errors': int(errors),
+        'bit_error_percentage': errors / len(binary_data) * 100,
+        'profile_json': job.profiler.to_json(),
+    }
+    job.publish(summary=summary)
+    return summary
+
+def run_ber_sweep(job):
+    # Monte Carlo BER sweep, spread over a process pool and stopped per
+    # point once enough errors have been counted. Progress is reported per
+    # finished SNR point, and a cancel ends the sweep after the current wave.
+    results = job.run_stage('simulate_ber', simulate_ber, snr_values, max_bits=200000,
+                            tb=tb, fc=fc, sampling_rate=sampling_rate,
+                            should_stop=lambda: job.cancelled, progress=job.report)
+    job.check_cancelled()
+    return results
 
 def main():
     st.title('QPSK Modulation and Demodulation')
-    
+
     # Input text
     phrase = st.text_input("Enter text to modulate:")
-    
+
+    # Sleeps between stages are only for demonstrations; they hide real stage costs
+    demo_pacing = st.sidebar.checkbox("Demo pacing (pause between stages)", value=False)
+    show_profile = st.sidebar.checkbox("Show live stage profile", value=False)
+    track_memory = st.sidebar.checkbox("Track stage memory (tracemalloc, slows stages down)", value=True)
+    device_uri = st.sidebar.text_input("Device URI (blank to auto-detect, or replay:<recording>)", value="")
+
+    executor = get_job_executor()
+    if st.sidebar.button("Clear cached results"):
+        executor.clear()
+
+    # Jobs outlive script reruns, so after any interaction polling picks up where it left off
+    jobs = [executor.get(job_id) for job_id in st.session_state.get('job_ids', ())]
+
     if st.button("Start Modulation"):
         if not phrase:
             st.error("Please enter a phrase.")
+        elif jobs and None not in jobs and not jobs[0].done:
+            st.warning("A run is already in progress.")
         else:
-            progress_bar = st.progress(0)
-            task_placeholder = st.empty()
-            progress = 0
-            max_progress = 100  # Maximum value for progress bar
-            progress_step = max_progress // 10  # Step for each task
-
-            # Converting text to binary
-            task_placeholder.write("Converting text to binary...")
-            binary_data = string_to_binary(phrase)
-            progress += progress_step
-            progress_bar.progress(min(progress, max_progress))
-            time.sleep(2)
-
-            # Adding parity bits
-            task_placeholder.write("Adding parity bits...")
-            encoded_data = hamming_encode(np.array(binary_data))
-            parity_indices = [i for i in range(len(encoded_data)) if i % 7 >= 4]
-            progress += progress_step
-            progress_bar.progress(min(progress, max_progress))
-            time.sleep(2)
-
-            # Performing QPSK modulation
-            task_placeholder.write("Performing QPSK modulation...")
-            bit_rate = 500e6  # 500 Mbps
-            tb = 1 / bit_rate  # Symbol duration
-            fc = 500e6  # Carrier frequency
-            sampling_rate = 500  # Sampling rate
-            qpsk_signal, t, constellation_points = qpsk_modulate(encoded_data, tb, fc, sampling_rate)
-            progress += progress_step
-            progress_bar.progress(min(progress, max_progress))
-            time.sleep(2)
-
-            # Perform Transmission and Reception using ADALM-PLUTO
-            task_placeholder.write("Transmitting using ADALM-PLUTO...")
-            sdr = create_pluto_instance()
-            received_data, transmitted_data = transmit_and_receive(sdr, len(qpsk_signal), fc, fs=sdr.sample_rate)
-            task_placeholder.write("Receiving using ADALM-PLUTO...")
-            progress += progress_step
-            progress_bar.progress(min(progress, max_progress))
-
-            # Apply signal processing
-            task_placeholder.write("Automatic gain control...")
-            received_data = apply_agc(received_data)
-            received_data_corrected, freq_estimate = pll(received_data, sdr.sample_rate)
-            task_placeholder.write("Low pass filtering...")
-            received_data_filtered = low_pass_filter(received_data_corrected, cutoff_freq=0.1 * (sdr.sample_rate / 2), fs=sdr.sample_rate)
-            progress += progress_step
-            progress_bar.progress(min(progress, max_progress))
-
-            # Demodulating with a Hamming window
-            task_placeholder.write("Demodulating with a Hamming window...")
-            demod_binary = qpsk_demodulate(
-                qpsk_signal, t, sqrt(2/tb) * np.cos(2 * np.pi * fc * t), 
-                sqrt(2/tb) * np.sin(2 * np.pi * fc * t), len(encoded_data), sampling_rate)
-            progress += progress_step
-            progress_bar.progress(min(progress, max_progress))
-            time.sleep(2)
-
-            # Decoding and removing parity bits
-            task_placeholder.write("Decoding and removing parity bits...")
-            decoded_data = hamming_decode(np.array(demod_binary))
-            progress += progress_step
-            progress_bar.progress(min(progress, max_progress))
-            time.sleep(2)
-
-            # Converting binary back to text
-            task_placeholder.write("Converting binary back to text...")
-            received_phrase = binary_to_string(decoded_data[:len(binary_data)])
-            progress += progress_step
-            progress_bar.progress(min(progress, max_progress))
-            time.sleep(2)
-
-            # Clear the progress bar and task list
-            progress_bar.empty()
-            task_placeholder.empty()
-
-            # Calculate and print the error details
-            errors = np.sum(np.array(binary_data) != decoded_data[:len(binary_data)])
-            bit_error_prob = errors / len(binary_data)
-            bit_error_percentage = bit_error_prob * 100
-
-            # Store results in session state to persist data across button clicks
-            st.session_state['binary_data'] = binary_data
-            st.session_state['encoded_data'] = encoded_data
-            st.session_state['demod_binary'] = demod_binary
-            st.session_state['decoded_data'] = decoded_data
-            st.session_state['bit_error_percentage'] = bit_error_percentage
-            st.session_state['phrase'] = phrase
-            st.session_state['received_phrase'] = received_phrase
-            st.session_state['constellation_points'] = constellation_points
-            st.session_state['qpsk_signal'] = qpsk_signal
-            st.session_state['t'] = t
-            st.session_state['c1'] = sqrt(2/tb) * np.cos(2 * np.pi * fc * t)
-            st.session_state['c2'] = sqrt(2/tb) * np.sin(2 * np.pi * fc * t)
-            st.session_state['tb'] = tb
-            st.session_state['snr_values'] = np.arange(0, 21, 2)
-            st.session_state['ber_values'] = []
-
-            # Calculate BER for each SNR value
-            for snr_db in st.session_state['snr_values']:
-                snr_linear = 10**(snr_db/10)
-                noise_std_dev = sqrt(1/(2*snr_linear))
-                noisy_qpsk = qpsk_signal + noise_std_dev * np.random.randn(*qpsk_signal.shape)
-
-                # QPSK Demodulation
-                demod_binary_snr = qpsk_demodulate(noisy_qpsk, t, st.session_state['c1'], st.session_state['c2'], len(encoded_data), sampling_rate)
-
-                # Hamming decode the demodulated binary data
-                decoded_data_snr = hamming_decode(np.array(demod_binary_snr))
-
-                # Calculate Bit Error Rate (BER)
-                errors_snr = np.sum(np.array(binary_data) != decoded_data_snr[:len(binary_data)])
-                bit_error_rate = errors_snr / len(binary_data)
-                st.session_state['ber_values'].append(bit_error_rate)
-
-            # Display results
-            st.write(f"**Original Phrase:** {st.session_state['phrase']}")
-            st.write(f"**Received Phrase:** {st.session_state['received_phrase']}")
-            st.write(f"**Number of errors:** {errors}")
-            st.write(f"**Bit Error Probability:** {st.session_state['bit_error_percentage']:.2f}%")
-
-            st.write("**Original Binary Data:**")
-            st.text(st.session_state['binary_data'])
-        
-            st.write("**Encoded Binary Data (Parity bits in red):**")
-            st.markdown(color_code_parity(st.session_state['encoded_data']), unsafe_allow_html=True)
-        
-            st.write("**Demodulated Binary Data:**")
-            st.text(st.session_state['demod_binary'])
-        
-            st.write("**Decoded Binary Data:**")
-            st.text(st.session_state['decoded_data'])
-        
-            # Display plots within Streamlit
-            st.subheader('Plots')
-
-            # Message data, represented as an impulse plot of zeros and ones
-            st.pyplot(get_impulse_plot(st.session_state['binary_data'], title="Message Data (Impulse Plot)"))
-
-            # Encoded data with impulses of parity bits color-coded
-            st.pyplot(get_encoded_data_plot(st.session_state['encoded_data'], parity_indices=parity_indices, title="Encoded Data with Parity Bits"))
-
-            # Carrier signal
-            st.pyplot(get_carrier_signals_figure(st.session_state['t'], st.session_state['c1'], st.session_state['c2']))
-
-            # QPSK Modulated Signal
-            st.pyplot(get_qpsk_signal_figure(st.session_state['qpsk_signal'], st.session_state['t'], st.session_state['tb'], len(st.session_state['encoded_data']) // 2))
-
-            # **New Plot**: Received Signal from ADALM-Pluto
-            st.pyplot(get_received_signal_figure(st.session_state['t'], received_data_filtered))
-
-            # Demodulated data (should match the encoded data)
-            st.pyplot(get_impulse_plot(st.session_state['demod_binary'], title="Demodulated Data"))
-
-            # Decoded data as pulses
-            st.pyplot(get_impulse_plot(st.session_state['decoded_data'], title="Decoded Data"))
-            
-            # Constellation Diagram
-            st.pyplot(get_constellation_figure(st.session_state['constellation_points']))
+            # Every start goes over the air again, so the chain is never cached;
+            # the seeded BER sweep is, and the same parameters reuse it
+            chain_job = executor.submit(run_chain, phrase, device_uri, demo_pacing, get_device_pool(),
+                                        stages=CHAIN_STAGES, track_memory=track_memory)
+            # simulate_ber runs in worker processes, out of tracemalloc's reach
+            ber_job = executor.submit(run_ber_sweep, stages=['simulate_ber'], track_memory=False,
+                                      key=('ber_sweep', tuple(snr_values), tb, fc, sampling_rate))
+            st.session_state['job_ids'] = (chain_job.id, ber_job.id)
+            jobs = [chain_job, ber_job]
+
+    if not jobs or None in jobs:
+        return
+    chain_job, ber_job = jobs
+
+    if not (chain_job.done and ber_job.done) and st.button("Cancel"):
+        chain_job.cancel()
+        ber_job.cancel()
+
+    render_jobs(chain_job, ber_job, show_profile)
+
+def render_jobs(chain_job, ber_job, show_profile):
+    # Progress counts completed stages (and SNR points within the BER sweep);
+    # each page section is drawn once, as soon as the values it needs have
+    # been published
+    progress_bar = st.progress(0)
+    task_placeholder = st.empty()
+    profile_placeholder = st.empty() if show_profile else None
+    placeholders = [st.empty() for _ in SECTIONS]
+    rendered = set()
+    num_stages = len(chain_job.stages) + len(ber_job.stages)
+
+    while True:
+        finished = chain_job.done and ber_job.done
+        progress_bar.progress(min(sum(job.progress * len(job.stages) for job in (chain_job, ber_job)) / num_stages,
+                                  1.0))
+        running = [stage for stage in map(describe_stage, (chain_job, ber_job)) if stage is not None]
+        task_placeholder.write(f"Running {', '.join(running)}..." if running else "")
+        if show_profile:
+            profile_placeholder.dataframe(chain_job.profiler.records + ber_job.profiler.records)
+
+        partial = chain_job.snapshot()
+        if ber_job.status == DONE:
+            partial['ber_results'] = ber_job.result
+        for index, (inputs, render) in enumerate(SECTIONS):
+            if index not in rendered and inputs <= partial.keys():
+                with placeholders[index].container():
+                    render(partial)
+                rendered.add(index)
+
+        if finished:
+            break
+        time.sleep(POLL_INTERVAL)
+
+    # Clear the progress bar and task list
+    progress_bar.empty()
+    task_placeholder.empty()
+    for job in (chain_job, ber_job):
+        if job.status == FAILED:
+            st.error(str(job.error))
+        elif job.status == CANCELLED:
+            st.warning("The run was cancelled.")
+
+def describe_stage(job):
+    stage, stage_progress = job.stage, job.stage_progress
+    if stage is None or stage_progress is None:
+        return stage
+    return f"{stage} ({stage_progress[0]}/{stage_progress[1]})"
+
+def render_summary(partial):
+    summary = partial['summary']
+    st.write(f"**Original Phrase:** {summary['phrase']}")
+    st.write(f"**Received Phrase:** {summary['received_phrase']}")
+    st.write(f"**Number of errors:** {summary['errors']}")
+    st.write(f"**Bit Error Probability:** {summary['bit_error_percentage']:.2f}%")
+    st.download_button("Download stage profile (JSON)", summary['profile_json'], file_name="stage_profile.json")
+
+def render_binary_data(partial):
+    st.write("**Original Binary Data:**")
+    st.text(partial['binary_data'])
+
+def render_encoded_data(partial):
+    st.write("**Encoded Binary Data (Parity bits in red):**")
+    st.markdown(color_code_parity(partial['encoded_data']), unsafe_allow_html=True)
+
+def render_demod_binary(partial):
+    st.write("**Demodulated Binary Data:**")
+    st.text(partial['demod_binary'])
+
+def render_decoded_data(partial):
+    st.write("**Decoded Binary Data:**")
+    st.text(partial['decoded_data'])
+
+def render_message_plot(partial):
+    # Display plots within Streamlit
+    st.subheader('Plots')
+
+    # Message data, represented as an impulse plot of zeros and ones
+    st.pyplot(get_impulse_plot(partial['binary_data'], title="Message Data (Impulse Plot)"))
+
+def render_encoded_plot(partial):
+    # Encoded data with impulses of parity bits color-coded
+    st.pyplot(get_encoded_data_plot(partial['encoded_data'], parity_indices=partial['parity_indices'], title="Encoded Data with Parity Bits"))
+
+def render_modulation_plots(partial):
+    # Carrier signal, from the same cached arrays qpsk_modulate used
+    st.pyplot(get_carrier_signals_figure(*carriers(tb, fc, sampling_rate)))
+
+    # QPSK Modulated Signal
+    st.pyplot(get_qpsk_signal_figure(partial['qpsk_signal'], partial['t'], tb, len(partial['encoded_data']) // 2))
+
+def render_received_plot(partial):
+    # **New Plot**: Received Signal from ADALM-Pluto
+    received_data = partial['received_data']
+    st.pyplot(get_received_signal_figure(np.arange(len(received_data)) / partial['sample_rate'], received_data))
+
+def render_spectrum(partial):
+    # Spectrum of the received capture
+    freqs, psd_db, link = partial['spectrum']
+    st.write(f"**Carrier offset:** {link['carrier_offset'] / 1e3:.1f} kHz, "
+             f"**occupied bandwidth:** {link['occupied_bandwidth'] / 1e3:.1f} kHz, "
+             f"**SNR:** {link['snr_db']:.1f} dB")
+    st.pyplot(get_spectrum_figure(freqs, psd_db))
+
+def render_demod_plot(partial):
+    # Demodulated data (should match the encoded data)
+    st.pyplot(get_impulse_plot(partial['demod_binary'], title="Demodulated Data"))
+
+def render_decoded_plot(partial):
+    # Decoded data as pulses
+    st.pyplot(get_impulse_plot(partial['decoded_data'], title="Decoded Data"))
+
+def render_constellation(partial):
+    # Constellation Diagram
+    st.pyplot(get_constellation_figure(partial['constellation_points']))
+
+def render_ber(partial):
+    # BER vs. SNR with confidence bounds
+    ber_results = partial['ber_results']
+    st.pyplot(get_ber_vs_snr_figure(snr_values, ber_results['ber'], ber_results['ber_lower'], ber_results['ber_upper']))
+
+# Page sections in display order, with the published values each one needs
+SECTIONS = [
+    ({'summary'}, render_summary),
+    ({'binary_data'}, render_binary_data),
+    ({'encoded_data'}, render_encoded_data),
+    ({'demod_binary'}, render_demod_binary),
+    ({'decoded_data'}, render_decoded_data),
+    ({'binary_data'}, render_message_plot),
+    ({'encoded_data', 'parity_indices'}, render_encoded_plot),
+    ({'qpsk_signal', 't', 'encoded_data'}, render_modulation_plots),
+    ({'received_data', 'sample_rate'}, render_received_plot),
+    ({'spectrum'}, render_spectrum),
+    ({'demod_binary'}, render_demod_plot),
+    ({'decoded_data'}, render_decoded_plot),
+    ({'constellation_points'}, render_constellation),
+    ({'ber_results'}, render_ber),
+]
 
 def color_code_parity(encoded_data):
     colored_text = ""
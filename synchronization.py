@@ -0,0 +1,195 @@
+from functools import lru_cache
+import numpy as np
+from scipy import fft, signal
+from modulation import qpsk_modulate_baseband, rrc_taps
+from demodulation import qpsk_demodulate_baseband
+
+# Framed, pulse-shaped QPSK over the radio. A frame is a known preamble (a
+# maximum-length sequence on the diagonal QPSK points) followed by the payload,
+# shaped with the root-raised-cosine pulse of modulation.qpsk_modulate_baseband.
+# The receiver finds the frame by FFT cross-correlation with the preamble
+# waveform, matched-filters it, recovers symbol timing with a block-vectorized
+# Gardner detector, removes the carrier phase/frequency offset measured on the
+# preamble (frequency refined over the whole frame) and decides the payload
+# symbols.
+
+PREAMBLE_ORDER = 7  # 127-symbol preamble
+
+@lru_cache(maxsize=4)
+def preamble_bits(order=PREAMBLE_ORDER):
+    sequence = signal.max_len_seq(order)[0]
+    bits = np.repeat(sequence, 2)  # equal bit pairs: +/-(1 + 1j) / sqrt(2)
+    bits.flags.writeable = False
+    return bits
+
+@lru_cache(maxsize=8)
+def _preamble_waveform(samples_per_symbol, rolloff, span):
+    waveform = qpsk_modulate_baseband(preamble_bits(), samples_per_symbol, pulse='rrc', rolloff=rolloff, span=span)
+    waveform.flags.writeable = False
+    return waveform
+
+def build_frame(encoded_data, samples_per_symbol=8, rolloff=0.35, span=8):
+    bits = np.concatenate((preamble_bits(), np.asarray(encoded_data)))
+    return qpsk_modulate_baseband(bits, samples_per_symbol, pulse='rrc', rolloff=rolloff, span=span)
+
+def frame_length(num_bits, samples_per_symbol=8, span=8):
+    num_symbols = len(preamble_bits()) // 2 + -(-num_bits // 2)
+    return (num_symbols - 1) * samples_per_symbol + span * samples_per_symbol + 1
+
+def detect_frame(iq, num_bits, samples_per_symbol=8, rolloff=0.35, span=8, threshold=0.5, num_segments=4):
+    # Normalized cross-correlation |<x, p>|^2 / (|p|^2 |x|^2) against the
+    # preamble waveform, computed for num_segments pieces of the preamble and
+    # averaged non-coherently so a carrier offset that rotates the preamble by
+    # several radians still gives a clear peak. Only starts that leave room
+    # for the whole frame are considered. Each piece is short next to the
+    # search window, so correlating by overlap-add convolution with the
+    # conjugated, time-reversed piece is much cheaper than a full-length FFT.
+    iq = np.asarray(iq)
+    reference = _preamble_waveform(samples_per_symbol, rolloff, span)
+    num_starts = len(iq) - frame_length(num_bits, samples_per_symbol, span) + 1
+    if num_starts <= 0:
+        return None
+
+    search = iq[:num_starts + len(reference) - 1]
+    energy = np.zeros(len(search) + 1)
+    np.cumsum(search.real ** 2 + search.imag ** 2, out=energy[1:])
+    bounds = np.linspace(0, len(reference), num_segments + 1).astype(int)
+    metric = np.zeros(num_starts)
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        piece = reference[first:last]
+        correlation = signal.oaconvolve(search[first:first + num_starts + len(piece) - 1],
+                                        np.conj(piece[::-1]), mode='valid')
+        power = np.abs(correlation)
+        power *= power
+        window_energy = np.subtract(energy[first + len(piece):first + len(piece) + num_starts],
+                                    energy[first:first + num_starts])
+        window_energy *= np.sum(np.abs(piece) ** 2)
+        window_energy += np.finfo(float).tiny
+        power /= window_energy
+        metric += power
+    metric /= num_segments
+
+    start = int(np.argmax(metric))
+    if metric[start] < threshold:
+        return None
+    return start, float(metric[start])
+
+def _interpolate(x, positions):
+    index = positions.astype(int)  # positions are kept >= 0
+    fraction = positions - index
+    return x[index] + (x[index + 1] - x[index]) * fraction
+
+def gardner_timing_recovery(x, samples_per_symbol, first_sample, num_symbols, block_size=256, gain=0.5):
+    # Gardner error e_k = Re{conj(y[k - 1/2]) * (y[k] - y[k - 1])} is evaluated
+    # for a whole block of symbols at the current timing offset; its mean,
+    # normalized by the symbol power, then moves the offset for the next block.
+    # Symbols are taken by linear interpolation of the matched-filter output.
+    sps = samples_per_symbol
+    max_offset = min(sps / 2, first_sample - sps / 2)
+    tau = 0.0
+    symbols = np.empty(num_symbols, dtype=complex)
+    # Zero padding lets the interpolator run past the end without bounds checks
+    x = np.concatenate((x, np.zeros(2 * sps + 2, dtype=x.dtype)))
+    on_time_offsets = first_sample + sps * np.arange(block_size, dtype=float)
+
+    for start in range(0, num_symbols, block_size):
+        count = min(block_size, num_symbols - start)
+        positions = on_time_offsets[:count] + (start * sps + tau)
+        on_time = _interpolate(x, positions)
+        symbols[start:start + count] = on_time
+        if count < 2:
+            break
+
+        midpoints = _interpolate(x, positions[1:] - sps / 2)
+        error = np.real(np.conj(midpoints) * (on_time[1:] - on_time[:-1])).mean()
+        power = np.vdot(on_time, on_time).real / count + 1e-30
+        tau = min(max(tau - gain * sps * error / power, -max_offset), max_offset)
+
+    return symbols, tau
+
+def _fourth_power(symbols):
+    # Every QPSK point maps to -1; weighting by |s|^2 rather than |s|^4 holds
+    # up better at low SNR
+    return -symbols ** 4 / (np.abs(symbols) ** 2 + 1e-30)
+
+def correct_carrier(symbols, num_preamble_symbols, block_size=64, smoothing=5):
+    # Frequency from the autocorrelation of the preamble with the known symbols
+    # removed, first at lag 1 (unambiguous up to +/-pi per symbol) and then at
+    # longer lags on the derotated preamble, each within the ambiguity left by
+    # the one before. No phase unwrapping, so noise cannot add 2*pi jumps.
+    index = np.arange(len(symbols))
+    reference = (2 * preamble_bits()[0::2] - 1) * (1 + 1j) / np.sqrt(2)
+    wiped = symbols[:num_preamble_symbols] * np.conj(reference[:num_preamble_symbols])
+    slope = 0.0
+    for lag in (1, 8, 32):
+        if lag >= len(wiped):
+            break
+        derotated = wiped * np.exp(-1j * slope * index[:len(wiped)])
+        slope += np.angle(np.vdot(derotated[:-lag], derotated[lag:])) / lag
+
+    # 127 symbols still leave the slope a few mrad/symbol off, which a long
+    # frame turns into radians of drift, so refine it over the whole frame at
+    # the periodogram peak of the fourth power, searched within 0.05 rad/symbol
+    fourth_power = _fourth_power(symbols * np.exp(-1j * slope * index))
+    size = fft.next_fast_len(2 * len(symbols))
+    spectrum = np.abs(fft.fft(fourth_power, size)) ** 2
+    reach = int(size * 0.2 / (2 * np.pi))
+    candidates = np.arange(-reach, reach + 1)  # negative bins wrap around
+    peak = candidates[np.argmax(spectrum[candidates])]
+    below, centre, above = spectrum[[peak - 1, peak, peak + 1]]
+    curvature = below - 2 * centre + above
+    offset = 0.5 * (below - above) / curvature if curvature < 0 else 0.0
+    slope += 2 * np.pi * (peak + offset) / size / 4
+
+    intercept = np.angle(np.mean(wiped * np.exp(-1j * slope * index[:len(wiped)])))
+    symbols = symbols * np.exp(-1j * (intercept + slope * index))
+
+    # Track what is left (phase noise) per block with the fourth power summed
+    # over `smoothing` neighbouring blocks, interpolated between block centres.
+    # With the frequency removed the residual stays near zero, so each block
+    # takes the principal value in (-pi/4, pi/4] instead of unwrapping from
+    # block to block: one noisy block cannot slip the rest of the frame onto
+    # another quadrant.
+    num_blocks = -(-len(symbols) // block_size)
+    padded = np.zeros(num_blocks * block_size, dtype=complex)
+    padded[:len(symbols)] = symbols
+    block_power = np.sum(_fourth_power(padded).reshape(num_blocks, block_size), axis=1)
+    block_power = np.convolve(block_power, np.ones(smoothing), mode='same')
+    residual = np.angle(block_power) / 4
+    centres = np.minimum(np.arange(num_blocks) * block_size + block_size / 2, len(symbols) - 1)
+    symbols *= np.exp(-1j * np.interp(index, centres, residual))
+    return symbols, intercept, slope
+
+def synchronize_frame(iq, num_bits, samples_per_symbol=8, rolloff=0.35, span=8, threshold=0.5):
+    # Returns the payload symbols at one sample per symbol, or None when no frame is found
+    iq = np.asarray(iq)
+    detection = detect_frame(iq, num_bits, samples_per_symbol, rolloff, span, threshold)
+    if detection is None:
+        return None
+    start, metric = detection
+
+    num_preamble_symbols = len(preamble_bits()) // 2
+    num_symbols = num_preamble_symbols + -(-num_bits // 2)
+    taps = rrc_taps(samples_per_symbol, rolloff, span)
+
+    # Matched filter over the frame only; symbol k peaks at span * sps + k * sps
+    segment = iq[start:start + frame_length(num_bits, samples_per_symbol, span) + samples_per_symbol]
+    matched = signal.oaconvolve(segment, taps)
+    symbols, tau = gardner_timing_recovery(matched, samples_per_symbol, span * samples_per_symbol, num_symbols)
+    symbols, phase_offset, freq_offset = correct_carrier(symbols, num_preamble_symbols)
+
+    info = {
+        "start": start,
+        "metric": metric,
+        "timing_offset": float(tau),
+        "phase_offset": float(phase_offset),
+        "freq_offset_rad_per_symbol": float(freq_offset),
+    }
+    return symbols[num_preamble_symbols:], info
+
+def receive_frame(iq, num_bits, samples_per_symbol=8, rolloff=0.35, span=8, threshold=0.5, soft=False):
+    synchronized = synchronize_frame(iq, num_bits, samples_per_symbol, rolloff, span, threshold)
+    if synchronized is None:
+        return None
+    symbols, info = synchronized
+    return qpsk_demodulate_baseband(symbols, soft=soft)[:num_bits], info
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+from batch_runner import run_payload
+from ber_simulation import simulate_ber
+
+
+@pytest.mark.parametrize("fec, soft", [("hamming", False), ("conv:1/2", True)])
+def test_low_snr_ber_matches_simulation(tmp_path, fec, soft):
+    # Through frame sync at 2 dB Es/N0 the decoded BER should roughly match
+    # the ideal-sync Monte Carlo, whose SNR axis is Eb/N0 per coded bit (3 dB
+    # lower). Convolutional errors come in bursts, hence the loose bound; a
+    # cycle slip or a wrong frequency estimate costs well over 2x.
+    path = tmp_path / "payload.bin"
+    path.write_bytes(np.random.default_rng(0).integers(0, 256, 8192, dtype=np.uint8).tobytes())
+    result = run_payload(str(path), snr_db=2.0, fec=fec, soft=soft)
+    expected = simulate_ber([2.0 - 10 * np.log10(2)], max_workers=1, max_bits=131072, target_errors=10**6,
+                            fec=fec, soft=soft)["ber"][0]
+
+    assert result["frames_lost"] == 0
+    assert result["delivered_bits"] == result["bits"]
+    assert 0.5 < result["ber"] / expected < 2
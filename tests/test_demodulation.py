@@ -0,0 +1,13 @@
+import numpy as np
+from demodulation import LLR_LIMIT, qpsk_demodulate, qpsk_demodulate_baseband
+from modulation import qpsk_modulate, qpsk_modulate_baseband
+
+
+def test_clean_signal_gives_finite_llrs():
+    bits = np.random.default_rng(0).integers(0, 2, 1000)
+    qpsk_signal, t, _ = qpsk_modulate(bits, 2e-9)
+    for llrs in (qpsk_demodulate_baseband(qpsk_modulate_baseband(bits), soft=True),
+                 qpsk_demodulate(qpsk_signal, t, None, None, len(bits), tb=2e-9, fc=500e6, soft=True)):
+        assert np.all(np.isfinite(llrs))
+        assert np.max(np.abs(llrs)) <= LLR_LIMIT
+        np.testing.assert_array_equal(llrs > 0, bits == 1)
@@ -0,0 +1,109 @@
+import sys
+import types
+from unittest import mock
+import pytest
+from device_pool import PLUTO_CONFIG, DevicePool, discover_devices
+
+CONTEXTS = {
+    "usb:1.5.5": "0456:b673 (Analog Devices Inc. PlutoSDR (ADALM-PLUTO))",
+    "usb:1.6.5": "0456:b673 (Analog Devices Inc. PlutoSDR (ADALM-PLUTO))",
+    "ip:10.0.0.9": "Some other IIO device",
+}
+
+
+@pytest.fixture
+def adi(monkeypatch):
+    # Mocked pyadi-iio: every adi.Pluto(uri=...) call returns a new mock device
+    module = types.ModuleType("adi")
+    module.Pluto = mock.Mock(side_effect=lambda uri: mock.Mock(name=uri))
+    monkeypatch.setitem(sys.modules, "adi", module)
+    return module
+
+
+def test_discover_filters_plutos():
+    assert sorted(discover_devices(lambda: CONTEXTS)) == ["usb:1.5.5", "usb:1.6.5"]
+
+
+def test_session_is_opened_and_configured_once(adi):
+    pool = DevicePool(scan=lambda: CONTEXTS)
+    first = pool.get("usb:1.5.5")
+    second = pool.get("usb:1.5.5")
+
+    assert first is second
+    adi.Pluto.assert_called_once_with(uri="usb:1.5.5")
+    assert first.sample_rate == PLUTO_CONFIG["sample_rate"]
+    assert len(pool) == 1
+
+
+def test_only_changed_settings_are_pushed(adi):
+    pool = DevicePool(scan=lambda: CONTEXTS)
+    session = pool.session("usb:1.5.5")
+    assert session.configure({"rx_lo": PLUTO_CONFIG["rx_lo"]}) == {}
+    assert session.configure({"rx_lo": 915000000}) == {"rx_lo": 915000000}
+    assert session.sdr.rx_lo == 915000000
+
+
+def test_default_uri_is_first_discovered_device(adi):
+    pool = DevicePool(scan=lambda: CONTEXTS)
+    assert pool.session().uri == "usb:1.5.5"
+    with pytest.raises(RuntimeError):
+        DevicePool(scan=lambda: {}).session()
+
+
+def test_release_tears_down_and_reopens(adi):
+    pool = DevicePool(scan=lambda: CONTEXTS)
+    session = pool.session("usb:1.5.5")
+    sdr = session.sdr
+    pool.release("usb:1.5.5")
+
+    sdr.rx_destroy_buffer.assert_called_once_with()
+    sdr.tx_destroy_buffer.assert_called_once_with()
+    assert session.sdr is None and len(pool) == 0
+    assert pool.get("usb:1.5.5") is not sdr
+    assert adi.Pluto.call_count == 2
+
+
+def test_close_releases_every_session(adi):
+    pool = DevicePool(scan=lambda: CONTEXTS)
+    devices = [pool.get(uri) for uri in ("usb:1.5.5", "usb:1.6.5")]
+    pool.close()
+    assert len(pool) == 0
+    for sdr in devices:
+        sdr.rx_destroy_buffer.assert_called_once_with()
+
+
+def test_run_on_every_device(adi):
+    pool = DevicePool(scan=lambda: CONTEXTS)
+    results = pool.run(lambda sdr: sdr, config={"rx_lo": 915000000})
+    assert sorted(results) == ["usb:1.5.5", "usb:1.6.5"]
+    assert all(sdr.rx_lo == 915000000 for sdr in results.values())
+
+
+def test_default_uri_is_remembered(adi):
+    scan = mock.Mock(return_value=CONTEXTS)
+    pool = DevicePool(scan=scan)
+    assert pool.session().uri == "usb:1.5.5"
+    assert pool.session().uri == "usb:1.5.5"
+    scan.assert_called_once_with()
+
+    pool.discover()
+    assert scan.call_count == 2
+
+
+def test_default_uri_rescanned_when_open_fails(adi):
+    contexts = dict(CONTEXTS)
+    pool = DevicePool(scan=lambda: contexts)
+    assert pool.session().uri == "usb:1.5.5"
+    pool.release("usb:1.5.5")
+
+    # The first device was unplugged: opening it fails and the next scan moves on
+    del contexts["usb:1.5.5"]
+
+    def open_device(uri):
+        if uri not in contexts:
+            raise OSError(f"no device at {uri}")
+        return mock.Mock(name=uri)
+
+    adi.Pluto.side_effect = open_device
+    assert pool.session().uri == "usb:1.6.5"
+    assert pool.default_uri == "usb:1.6.5"
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+import dsp
+from dsp import AutomaticGainControl, CarrierRecovery, LowPassFilter, apply_agc, low_pass_filter, pll
+
+
+# Reference copy of the original per-sample pluto.pll
+def legacy_pll(input_signal, fs, loop_bandwidth=0.01):
+    phase_estimate = 0.0
+    output_signal = np.zeros_like(input_signal, dtype=complex)
+    freq_estimate = 0.0
+    Kp = 2 * np.pi * loop_bandwidth
+    Ki = (Kp ** 2) / 4
+    integrator = 0.0
+
+    for i in range(len(input_signal)):
+        phase_error = np.angle(input_signal[i] * np.exp(-1j * phase_estimate))
+        integrator += Ki * phase_error
+        freq_estimate = integrator + Kp * phase_error
+        phase_estimate += freq_estimate / fs
+        output_signal[i] = input_signal[i] * np.exp(-1j * phase_estimate)
+
+    return output_signal, freq_estimate
+
+
+def tone(n, fs, freq_offset, phase=0.5):
+    return np.exp(1j * (2 * np.pi * freq_offset * np.arange(n) / fs + phase))
+
+
+@pytest.mark.parametrize("freq_offset", [0.0, 1e-3])
+def test_pll_matches_legacy_loop_while_locking(freq_offset):
+    # fs=1 with bandwidth 0.01: the loop locks within a few hundred samples
+    x = tone(5000, 1, freq_offset)
+    expected, expected_freq = legacy_pll(x, 1)
+    output, freq = pll(x, 1)
+
+    np.testing.assert_allclose(output, expected, atol=1e-12)
+    assert freq == pytest.approx(expected_freq, abs=1e-12)
+    assert freq == pytest.approx(2 * np.pi * freq_offset, abs=1e-9)
+    # Locked: what is left is the one-sample phase step of the offset
+    assert abs(np.angle(output[-1])) < 2 * np.pi * freq_offset + 1e-6
+
+
+def test_pll_state_carries_across_buffers():
+    x = tone(5000, 1, 1e-3)
+    expected, _ = legacy_pll(x, 1)
+    recovery = CarrierRecovery(1)
+    output = np.concatenate([recovery.process(x[start:start + 777]) for start in range(0, len(x), 777)])
+    np.testing.assert_allclose(output, expected, atol=1e-9)
+
+
+def test_pll_in_place_single_precision():
+    x = tone(5000, 1, 1e-3).astype(np.complex64)
+    expected, _ = pll(x.copy(), 1)
+    output, _ = pll(x, 1, out=x)
+    assert output is x and x.dtype == np.complex64
+    np.testing.assert_array_equal(x, expected)
+
+
+def test_block_engine_tracks_loop_in_its_regime():
+    fs = 6e6
+    x = tone(200000, fs, 1e4)
+    expected, expected_freq = legacy_pll(x, fs)
+    recovery = CarrierRecovery(fs, engine="block")
+    output = recovery.process(x)
+    np.testing.assert_allclose(output, expected, atol=1e-3)
+    assert recovery.freq_estimate == pytest.approx(expected_freq, rel=1e-2)
+
+
+def test_block_engine_rejected_outside_its_regime():
+    with pytest.raises(ValueError):
+        CarrierRecovery(1, engine="block")
+
+
+def test_auto_engine_choice():
+    # Without numba, auto runs the block engine where it is valid and the exact loop elsewhere
+    expected = "jit" if dsp._pll_loop_jit is not None else "block"
+    assert CarrierRecovery(6e6).engine == expected
+    assert CarrierRecovery(1).engine in ("jit", "loop")
+
+
+def test_agc_first_buffer_matches_apply_agc():
+    x = tone(4096, 1, 1e-3) * 5
+    np.testing.assert_allclose(AutomaticGainControl().process(x), apply_agc(x))
+
+
+def test_agc_gain_is_continuous_across_buffers():
+    # A 10x louder second half: per-buffer AGC jumps at the boundary, the
+    # streaming AGC ramps from the previous gain instead
+    x = np.concatenate((np.ones(4096), 10 * np.ones(4096), 10 * np.ones(4096))).astype(np.complex64)
+    agc = AutomaticGainControl()
+    output = np.concatenate([agc.process(x[start:start + 4096]) for start in range(0, len(x), 4096)])
+
+    gain = np.abs(output) / np.abs(x)
+    assert output.dtype == np.complex64
+    assert np.max(np.abs(np.diff(gain))) < 1e-3
+    assert gain[-1] == pytest.approx(0.01)
+
+
+def test_agc_in_place():
+    x = tone(4096, 1, 1e-3).astype(np.complex64)
+    agc = AutomaticGainControl()
+    for start in (0, 2048):
+        buffer = x[start:start + 2048]
+        assert agc.process(buffer, out=buffer) is buffer
+    assert np.max(np.abs(x)) == pytest.approx(0.1, rel=1e-5)
+
+
+@pytest.mark.parametrize("method", ["iir", "fir"])
+def test_low_pass_filter_in_place_matches_allocating(method):
+    x = tone(300000, 6e6, 1e4).astype(np.complex64)
+    expected = LowPassFilter(3e5, 6e6, method=method).process(x)
+    output = LowPassFilter(3e5, 6e6, method=method).process(x, out=x)
+
+    assert output is x and x.dtype == np.complex64
+    np.testing.assert_allclose(x, expected, atol=1e-5)
+    np.testing.assert_allclose(low_pass_filter(expected, 3e5, 6e6, out=np.empty_like(expected)),
+                               low_pass_filter(expected, 3e5, 6e6), atol=1e-5)
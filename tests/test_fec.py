@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from ber_simulation import simulate_ber
+from fec import make_codec
+
+SPECS = ["none", "hamming", "conv:1/2", "conv:3/4", "crc32+conv:2/3", "interleaver:8",
+         "conv:1/2+interleaver:8", "hamming+interleaver:4"]
+
+
+@pytest.mark.parametrize("spec", SPECS)
+@pytest.mark.parametrize("soft", [False, True])
+def test_round_trip_decodes_to_bits(spec, soft):
+    codec = make_codec(spec)
+    bits = np.random.default_rng(0).integers(0, 2, (3, 96))
+    encoded = codec.encode_batch(bits)
+    received = 4.0 * (2 * encoded - 1) if soft else encoded
+
+    decoded, ok = codec.decode_batch(received, bits.shape[1], soft)
+    assert decoded.dtype.kind == "i"
+    np.testing.assert_array_equal(decoded, bits)
+    assert ok.all()
+
+
+def test_crc_flags_corrupted_frames():
+    codec = make_codec("crc32")
+    bits = np.random.default_rng(1).integers(0, 2, (2, 64))
+    encoded = codec.encode_batch(bits)
+    encoded[1, 5] ^= 1
+    _, ok = codec.decode_batch(encoded, 64)
+    assert ok.tolist() == [True, False]
+
+
+def test_simulate_ber_coded_alias():
+    expected = simulate_ber([4], max_workers=1, max_bits=8192, fec="none")
+    with pytest.warns(DeprecationWarning):
+        result = simulate_ber([4], max_workers=1, max_bits=8192, coded=False)
+    np.testing.assert_array_equal(result["errors"], expected["errors"])
@@ -0,0 +1,106 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from jobs import CANCELLED, DONE, FAILED, JobExecutor
+
+
+def wait(job, timeout=5):
+    deadline = time.time() + timeout
+    while not job.done and time.time() < deadline:
+        time.sleep(0.005)
+    return job
+
+
+@pytest.fixture
+def executor():
+    executor = JobExecutor(max_workers=2, max_finished=2)
+    yield executor
+    executor.shutdown()
+
+
+def staged(job, num_stages, gate=None):
+    for index in range(num_stages):
+        job.run_stage(f"stage{index}", lambda: np.ones(1000))
+        job.publish(last=index)
+        if gate is not None:
+            gate.wait(5)
+    return num_stages
+
+
+def test_progress_partial_results_and_profile(executor):
+    gate = threading.Event()
+    job = executor.submit(staged, 3, gate, stages=["stage0", "stage1", "stage2"])
+    while job.snapshot().get("last") != 0:
+        time.sleep(0.005)
+    assert job.progress == pytest.approx(1 / 3)
+    gate.set()
+
+    assert wait(job).status == DONE and job.result == 3
+    assert [record["stage"] for record in job.profiler.records] == ["stage0", "stage1", "stage2"]
+    assert all(record["peak_bytes"] is not None for record in job.profiler.records)
+
+
+def test_keyed_jobs_are_reused_and_unkeyed_jobs_rerun(executor):
+    first = wait(executor.submit(staged, 1, key="sweep"))
+    assert executor.submit(staged, 1, key="sweep") is first
+    assert executor.submit(staged, 1) is not executor.submit(staged, 1)
+
+
+def test_cancel_and_failure(executor):
+    job = executor.submit(lambda job: [job.sleep(0.01) for _ in range(1000)], key="slow")
+    time.sleep(0.05)
+    job.cancel()
+    assert wait(job).status == CANCELLED
+    # Cancelled and failed jobs are not reused
+    assert executor.submit(staged, 1, key="slow") is not job
+
+    failed = wait(executor.submit(lambda job: 1 / 0))
+    assert failed.status == FAILED and isinstance(failed.error, ZeroDivisionError)
+
+
+def test_finished_jobs_are_evicted(executor):
+    jobs = [wait(executor.submit(staged, 1, key=index)) for index in range(4)]
+    executor.submit(staged, 1, key="last")
+    assert executor.get(jobs[0].id) is None
+    assert executor.get(jobs[-1].id) is jobs[-1]
+
+
+def test_figure_cache_is_thread_safe():
+    from plots import clear_figure_cache, get_impulse_plot
+
+    clear_figure_cache()
+    data = [np.random.default_rng(seed).integers(0, 2, 64) for seed in range(40)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        figures = list(pool.map(lambda bits: get_impulse_plot(bits, title="t"), data * 3))
+    # Every call gets its own Figure, cached or not
+    assert len({id(fig) for fig in figures}) == len(figures)
+
+
+def test_ber_sweep_reports_progress_and_stops():
+    from ber_simulation import simulate_ber
+
+    reports = []
+    results = simulate_ber([0, 20], batch_bits=256, batches_per_wave=2, max_workers=1,
+                           should_stop=lambda: True, progress=lambda done, total: reports.append((done, total)))
+    # Stopped after the first wave: two batches per point, neither point finished
+    assert reports == [(0, 2)]
+    assert list(results["bits"]) == [512, 512]
+
+
+def test_cancelled_ber_sweep_job(executor):
+    from ber_simulation import simulate_ber
+
+    def sweep(job):
+        results = job.run_stage("simulate_ber", simulate_ber, [0, 20], batch_bits=256, batches_per_wave=1,
+                                max_workers=1, should_stop=lambda: job.cancelled, progress=job.report)
+        job.check_cancelled()
+        return results
+
+    job = executor.submit(sweep, stages=["simulate_ber"])
+    while job.stage_progress is None and not job.done:
+        time.sleep(0.001)
+    assert job.stage_progress[1] == 2 and job.progress < 1
+    job.cancel()
+    assert wait(job).status == CANCELLED
@@ -0,0 +1,89 @@
+import threading
+import numpy as np
+from fake_pluto import FakePluto
+from streaming import StreamingReceiver
+
+
+def make_sdr(buffer_size=4096):
+    sdr = FakePluto(seed=1)
+    sdr.rx_buffer_size = buffer_size
+    return sdr
+
+
+def test_every_buffer_processed_in_order():
+    receiver = StreamingReceiver(make_sdr(), block_on_full=True, max_results=None)
+    results = receiver.run(20)
+
+    assert receiver.stats["received"] == 20
+    assert receiver.stats["processed"] == 20
+    assert receiver.stats["dropped"] == 0
+    assert [seq for seq, _ in results] == list(range(20))
+    assert all(buffer.dtype == np.complex64 and len(buffer) == 4096 for _, buffer in results)
+
+
+def test_full_ring_drops_buffers():
+    release = threading.Event()
+
+    def slow_stage(buffer):
+        release.wait(0.05)
+        return buffer
+
+    receiver = StreamingReceiver(make_sdr(), stages=[slow_stage], num_slots=2, max_results=None)
+    results = receiver.run(30)
+
+    stats = receiver.stats
+    assert stats["dropped"] > 0
+    assert stats["received"] == 30
+    assert stats["processed"] + stats["dropped"] == stats["received"]
+    assert len(results) == stats["processed"]
+    assert stats["max_in_flight"] <= 2
+
+
+def test_full_ring_stalls_when_blocking():
+    receiver = StreamingReceiver(make_sdr(), stages=[lambda buffer: threading.Event().wait(0.01) or buffer],
+                                 num_slots=2, block_on_full=True, max_results=None)
+    receiver.run(10)
+
+    assert receiver.stats["stalls"] > 0
+    assert receiver.stats["dropped"] == 0
+    assert receiver.stats["processed"] == 10
+
+
+def test_results_are_bounded():
+    receiver = StreamingReceiver(make_sdr(), block_on_full=True, max_results=3)
+    results = receiver.run(10)
+
+    assert receiver.stats["processed"] == 10
+    assert [seq for seq, _ in results] == [7, 8, 9]
+
+
+def test_sink_results_and_stage_errors():
+    receiver = StreamingReceiver(make_sdr(), sink=lambda buffer: len(buffer), block_on_full=True)
+    assert receiver.run(5) == [(seq, 4096) for seq in range(5)]
+
+    def broken(buffer):
+        raise RuntimeError("stage failed")
+
+    receiver = StreamingReceiver(make_sdr(), stages=[broken], block_on_full=True)
+    try:
+        receiver.run(5)
+    except RuntimeError as error:
+        assert str(error) == "stage failed"
+    else:
+        raise AssertionError("stage error was not raised")
+
+
+def test_double_precision_ring():
+    receiver = StreamingReceiver(make_sdr(), block_on_full=True, precision="double")
+    results = receiver.run(3)
+    assert results[0][1].dtype == np.complex128
+
+
+def test_default_stages_keep_up_in_real_time():
+    sdr = FakePluto(realtime=True, seed=1)
+    sdr.rx_buffer_size = 65536
+    receiver = StreamingReceiver(sdr)
+    receiver.run(60)
+
+    assert receiver.stats["received"] == 60
+    assert receiver.stats["dropped"] == 0
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from channel import Channel
+from synchronization import build_frame, receive_frame, synchronize_frame
+
+SPS = 8
+
+
+def received(bits, delay=1000, phase=0.7, freq_offset=2e-4, snr_db=20, seed=0):
+    # Frame after `delay` samples of silence, with a phase and carrier
+    # frequency offset (rad/sample) and AWGN, then a gap as long as the frame
+    frame = build_frame(bits, SPS)
+    iq = np.zeros(delay + 2 * len(frame), dtype=np.complex128)
+    iq[delay:delay + len(frame)] = frame
+    iq *= np.exp(1j * (phase + freq_offset * np.arange(len(iq))))
+    rng = np.random.default_rng(seed)
+    noise_std = np.sqrt(np.mean(np.abs(frame) ** 2) / (2 * 10 ** (snr_db / 10)))
+    iq += noise_std * (rng.standard_normal(len(iq)) + 1j * rng.standard_normal(len(iq)))
+    return iq
+
+
+@pytest.mark.parametrize("delay", [0, 1000, 4321])
+def test_frame_found_and_bits_recovered(delay):
+    bits = np.random.default_rng(1).integers(0, 2, 2000)
+    result = receive_frame(received(bits, delay=delay), len(bits), SPS)
+
+    assert result is not None
+    demod, info = result
+    assert info["start"] == pytest.approx(delay, abs=1)
+    np.testing.assert_array_equal(demod, bits)
+
+
+def test_carrier_offsets_estimated():
+    bits = np.random.default_rng(2).integers(0, 2, 2000)
+    symbols, info = synchronize_frame(received(bits, phase=0.7, freq_offset=2e-4), len(bits), SPS)
+
+    # Per-symbol frequency is SPS times the per-sample offset
+    assert info["freq_offset_rad_per_symbol"] == pytest.approx(SPS * 2e-4, rel=0.05)
+    reference = ((2 * bits[0::2] - 1) + 1j * (2 * bits[1::2] - 1)) / np.sqrt(2)
+    assert np.max(np.abs(np.angle(symbols * np.conj(reference)))) < np.pi / 4
+
+
+def test_no_frame_in_noise():
+    noise = np.random.default_rng(3).standard_normal(20000) * (1 + 1j)
+    assert synchronize_frame(noise, 2000, SPS) is None
+
+
+def test_frame_through_channel_model():
+    bits = np.random.default_rng(4).integers(0, 2, 1000)
+    frame = build_frame(bits, SPS)
+    iq = np.concatenate((np.zeros(500), frame, np.zeros(len(frame)))).astype(np.complex64)
+    Channel(snr_db=25, freq_offset=1e-4, phase=1.0, seed=5).process(iq, out=iq)
+    demod, _ = receive_frame(iq, len(bits), SPS)
+    np.testing.assert_array_equal(demod, bits)
+
+
+@pytest.mark.parametrize("freq_offset", [2e-4, 1e-3])
+def test_low_snr_carrier_recovery(freq_offset):
+    # Es/N0 = 2 dB, where one unwrap error in a per-symbol phase fit used to
+    # derail the frequency estimate; the symbol error rate should stay at the
+    # coherent QPSK value (about 0.2) with no quadrant slips
+    bits = np.random.default_rng(6).integers(0, 2, 8000)
+    iq = received(bits, freq_offset=freq_offset, snr_db=2 - 10 * np.log10(SPS), seed=6)
+    symbols, info = synchronize_frame(iq, len(bits), SPS, threshold=0.05)
+
+    assert info["freq_offset_rad_per_symbol"] == pytest.approx(SPS * freq_offset, rel=0.05)
+    reference = ((2 * bits[0::2] - 1) + 1j * (2 * bits[1::2] - 1)) / np.sqrt(2)
+    symbol_errors = np.mean(np.abs(np.angle(symbols * np.conj(reference))) > np.pi / 4)
+    assert symbol_errors < 0.23
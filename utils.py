@@ -1,15 +1,50 @@
+import codecs
 import numpy as np
 import matplotlib.pyplot as plt
 import os
 
+# Text and file payloads are converted through UTF-8 bytes and
+# np.unpackbits / np.packbits (MSB first), one uint8 per bit.
+
 def string_to_binary(phrase):
-    binary_string = ''.join(format(ord(char), '08b') for char in phrase)
-    return [int(bit) for bit in binary_string]
+    return bytes_to_binary(phrase.encode('utf-8'))
 
 def binary_to_string(binary_data):
-    binary_string = ''.join(str(bit) for bit in binary_data)
-    chars = [chr(int(binary_string[i:i+8], 2)) for i in range(0, len(binary_string), 8)]
-    return ''.join(chars)
+    # Bit errors can leave invalid UTF-8, which decodes to U+FFFD
+    return binary_to_bytes(binary_data).decode('utf-8', errors='replace')
+
+def bytes_to_binary(data):
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+def binary_to_bytes(binary_data):
+    binary_data = np.asarray(binary_data, dtype=np.uint8)
+    # Ignore trailing bits that do not fill a whole byte
+    return np.packbits(binary_data[:len(binary_data) // 8 * 8]).tobytes()
+
+def iter_file_chunks(path, chunk_size=1 << 20, packed=False):
+    # Stream a file as bit arrays (or packed uint8 arrays) of chunk_size bytes
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield np.frombuffer(chunk, dtype=np.uint8) if packed else bytes_to_binary(chunk)
+
+def iter_binary_to_string(binary_chunks):
+    # Decode a stream of bit arrays to text; chunks need not end on byte or
+    # character boundaries
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    carry = np.zeros(0, dtype=np.uint8)
+    for chunk in binary_chunks:
+        bits = np.concatenate((carry, np.asarray(chunk, dtype=np.uint8)))
+        whole = len(bits) // 8 * 8
+        carry = bits[whole:]
+        text = decoder.decode(np.packbits(bits[:whole]).tobytes())
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
 
 def save_plot(fig, filename):
     if not os.path.exists('plots'):
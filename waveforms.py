@@ -0,0 +1,57 @@
+from functools import lru_cache
+from math import sqrt
+import numpy as np
+from scipy.signal.windows import hamming
+
+# Shared cache of the deterministic waveforms of the chain: the passband QPSK
+# carriers used by both modulation.qpsk_modulate and demodulation.qpsk_demodulate,
+# and the Hamming-windowed test tone sent by pluto.transmit_and_receive. Each
+# waveform is computed once per parameter set (least recently used entries are
+# evicted) and returned as a read-only array, so every caller shares one copy.
+# dtype selects float32/complex64 or float64/complex128 storage.
+
+CARRIER_CACHE_SIZE = 16
+TONE_CACHE_SIZE = 2  # a one-second tone at 6 MS/s is ~96 MB as complex128
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+@lru_cache(maxsize=CARRIER_CACHE_SIZE)
+def _carrier_matrix(tb, fc, sampling_rate, dtype):
+    t = np.linspace(0, tb, sampling_rate)
+    matrix = np.empty((2, sampling_rate), dtype=dtype)
+    matrix[0] = sqrt(2/tb) * np.cos(2 * np.pi * fc * t)  # Cosine carrier (in-phase)
+    matrix[1] = sqrt(2/tb) * np.sin(2 * np.pi * fc * t)  # Sine carrier (quadrature)
+    return _read_only(t.astype(dtype)), _read_only(matrix)
+
+def carrier_matrix(tb, fc=500e6, sampling_rate=500, dtype=np.float64):
+    # (2, sampling_rate) array with rows c1 and c2, and the time axis t
+    return _carrier_matrix(float(tb), float(fc), int(sampling_rate), np.dtype(dtype).name)
+
+def carriers(tb, fc=500e6, sampling_rate=500, dtype=np.float64):
+    # t, c1, c2 as in the original qpsk_modulate; c1 and c2 are rows of carrier_matrix
+    t, matrix = carrier_matrix(tb, fc, sampling_rate, dtype)
+    return t, matrix[0], matrix[1]
+
+@lru_cache(maxsize=TONE_CACHE_SIZE)
+def _tone(num_samples, fc, fs, amplitude, dtype):
+    # Built in place in one float64 buffer, then cast into the IQ array
+    sine_wave = np.arange(num_samples, dtype=np.float64)
+    sine_wave /= fs
+    sine_wave *= 2 * np.pi * fc
+    np.cos(sine_wave, out=sine_wave)
+    sine_wave *= amplitude
+    sine_wave *= hamming(num_samples)
+    iq = np.empty(num_samples, dtype=dtype)
+    iq.real = sine_wave
+    iq.imag = sine_wave
+    return _read_only(iq)
+
+def hamming_tone(num_samples, fc, fs, amplitude=2**14, dtype=np.complex128):
+    # Hamming-windowed cosine on both I and Q, the TX test waveform of pluto.py
+    return _tone(int(num_samples), float(fc), float(fs), float(amplitude), np.dtype(dtype).name)
+
+def clear_waveform_cache():
+    _carrier_matrix.cache_clear()
+    _tone.cache_clear()